@@ -10,26 +10,49 @@ __author__ = 'dan@salmonsen.org (Dan Salmonsen)'
 
 #todo: check all exception types
 
+import bisect
+import json
+import logging
+import math
+import random
+import time
+import zlib
 from datetime import datetime
 
 import endpoints
 from protorpc import messages
 from protorpc import message_types
+from protorpc import protojson
 from protorpc import remote
 
+from google.appengine.api import app_identity
+from google.appengine.api import mail
 from google.appengine.api import memcache
 from google.appengine.api import taskqueue
 from google.appengine.ext import ndb
-from google.appengine.ext import db
 
 from models import ConflictException
+from models import TooManyRequestsException
 from models import StringMessage
 from models import BooleanMessage
 from models import Author, AuthorForm, AuthorMiniForm
-from models import Articles, KeyForm, KeyForms
+from models import AuthorCounter, FeaturedAuthor
+from models import KeyForm, KeyForms
 from models import Article, ArticleForm, ArticleUpdateForm, GetArticleForm, ArticleForms
+from models import ArticleRefForms, ArticleResultForm, ArticleResultForms, ArticlePageForms
 from models import ArticleQueryForm, ArticleQueryForms
 from models import Comment, CommentForm, CommentUpdateForm, CommentForms
+from models import AuthorPageForm
+from models import ArticleSubscribers
+from models import ArchiveCalendar, MonthCountForm, MonthCountForms
+from models import TagIndex, RelatedArticles
+from models import LegacyArticle, LegacyIDForms, LegacyArticleForm, LegacyArticleForms
+from models import SuggestionForm, SuggestionForms
+from models import ArticleChangeForm, ArticleChangeForms
+from models import ArchiveStats, ArchiveStatsForm, AuthorStatsForm, CountForm
+from models import TraceEventForm, TraceForm, TraceForms
+from models import ViewCounterShard, ArticleTrend
+from models import BulkOperation, BulkOperationForms, BulkResultForm, BulkResultForms
 
 from models import View, UserRights
 
@@ -39,12 +62,99 @@ from settings import IOS_CLIENT_ID
 from settings import ANDROID_AUDIENCE
 
 from utils import getUserId
-from pickle import dumps, loads
+import entitycache
+import render
+import tracing
 
 EMAIL_SCOPE = endpoints.EMAIL_SCOPE
 API_EXPLORER_CLIENT_ID = endpoints.API_EXPLORER_CLIENT_ID
 MEMCACHE_FEATURED_AUTHOR_KEY = "FEATURED_AUTHOR"
 MEMCACHE_FEATURED_ARTICLE_KEY = "FEATURED_ARTICLE"
+MEMCACHE_AUTHOR_ID_PREFIX = "AUTHOR_ID:"
+MEMCACHE_ARCHIVE_CALENDAR_KEY = "ARCHIVE_CALENDAR"
+ARCHIVE_CALENDAR_TTL = 60 * 60      # bounds a stale calendar a read put back after a change
+MEMCACHE_RATE_PREFIX = "RATE:"
+RATE_COUNTS_MAX = 10000
+MEMCACHE_SUGGEST_KEY = "SUGGEST"
+MEMCACHE_SUGGEST_GENERATION_KEY = "SUGGEST_GENERATION"
+MEMCACHE_SUGGEST_REBUILD_KEY = "SUGGEST_REBUILD"
+SUGGEST_REBUILD_LEASE = 10 * 60 # seconds a queued suggest index rebuild is left to finish
+SUGGEST_CHECK_INTERVAL = 30     # seconds between checks for a newer suggest index
+SUGGEST_CAS_RETRIES = 5
+SUGGEST_SCAN = 500              # max prefix matches ranked per suggest call
+SUGGEST_SIZE = 10
+CHANGES_PAGE_MAX = 500
+CLEANUP_BATCH = 500
+BULK_OPERATIONS_MAX = 1000
+BULK_BATCH = 200
+STATS_BATCH = 500
+STATS_STALLED = 60 * 60     # seconds without a batch after which a new run replaces a pending one
+STATS_KINDS = (Article, Comment, Author)    # Author last, to name the authors counted before
+AUTHOR_KEYS_MAX = 10000
+MEMCACHE_CACHE_PREFIX = "CACHE:"
+MEMCACHE_LEASE_PREFIX = "LEASE:"
+CACHE_HARD_TTL = 24 * 60 * 60   # memcache expiry of cached responses
+CACHE_LEASE_TTL = 30            # seconds a rebuild lease is held
+CACHE_LEASE_WAIT = 0.1          # seconds to wait for another request's rebuild
+CACHE_LEASE_RETRIES = 5
+CACHE_CHUNK_BYTES = 900 * 1000  # compressed bytes per value, under memcache's 1 MB limit
+CACHE_CHUNKS_MAX = 10           # larger responses aren't cached
+ARTICLE_BATCH_MAX = 100
+LEGACY_IDS_MAX = 100
+AUTHOR_PAGE_SIZE = 20
+ARCHIVE_PERIOD_MAX = 1000          # articles per page of a period
+BACKFILL_BATCH = 200
+HTML_KINDS = (Article, Comment)
+RELATED_QUEUE = 'related-articles'
+RELATED_SIZE = 10
+COMMENT_ALERT_QUEUE = 'comment-alerts'
+COMMENT_ALERT_LEASE = 5 * 60        # seconds to send a leased batch of alerts
+COMMENT_ALERT_BATCH = 1000          # max alerts leased at once
+COMMENT_ALERT_ROUNDS = 5
+# memcache buffers of per article counts; buffer NAME keeps the count of an article
+# at NAME:wsak and registers the article at NAME_SLOT:n, n counting up from NAME_SLOTS
+# with NAME_FLUSHED the last n drained and NAME_UNSET a slot a drain stopped at
+MEMCACHE_VIEWS_BUFFER = "VIEWS"
+MEMCACHE_COMMENTS_BUFFER = "COMMENTS"
+VIEW_COUNTER_SHARDS = 10
+TRENDING_HALF_LIFE = 24 * 60 * 60   # seconds for a view's trending weight to halve
+TRENDING_SIZE = 20
+
+# authorID: Author key, shared by all requests on this instance
+AUTHOR_KEYS = {}
+
+# endpoint name: (requests, per seconds) allowed to an AUTHOR or anonymous caller
+RATE_LIMITS = {
+    'createArticle':            (10, 60 * 60),
+    'createComment':            (30, 60 * 60),
+    'addArticleToFavorites':    (60, 60),
+    'queryArticles':            (60, 60),
+    'copyFromArticles':         (1, 60 * 60),
+}
+
+# RATE_LIMITS multiplier by Author.userRights; None is unlimited
+RATE_LIMIT_RIGHTS = {
+    'NONE':             1,
+    'AUTHOR':           1,
+    'FEATURED':         2,
+    'FELLOW':           5,
+    'ADMINISTRATOR':    None,
+}
+
+# rate limit window key: last count seen by this instance
+RATE_COUNTS = {}
+
+# suggest index shared by all requests on this instance; entries are
+# (lowercase text, kind, text, count) tuples sorted for bisect
+SUGGEST_INDEX = {'generation': None, 'checked': 0, 'entries': []}
+
+# cached response name: (response message class, builder method, soft TTL)
+CACHED_RESPONSES = {
+    'allArticles':      (ArticleForms, '_buildAllArticles', 5 * 60),
+    'featuredArticles': (ArticleForms, '_buildFeaturedArticles', 15 * 60),
+    'trendingArticles': (ArticleForms, '_buildTrendingArticles', 15 * 60),
+    'archiveStats':     (ArchiveStatsForm, '_buildArchiveStats', 60 * 60),
+}
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
 OPERATORS = {
@@ -90,6 +200,7 @@ ARTICLES_BY_AUTHOR = endpoints.ResourceContainer(
 ARTICLE_FAVORITES_REQUEST = endpoints.ResourceContainer(
     message_types.VoidMessage,
     websafeArticleKey=messages.StringField(1),
+    expectedVersion=messages.IntegerField(2),
 )
 
 ARTICLES_BY_TAG = endpoints.ResourceContainer(
@@ -113,6 +224,25 @@ COMMENT_UPDATE_REQUEST = endpoints.ResourceContainer(
     websafeCommentKey=messages.StringField(1),
 )
 
+ARTICLES_BY_PERIOD = endpoints.ResourceContainer(
+    message_types.VoidMessage,
+    year=messages.IntegerField(1),
+    month=messages.IntegerField(2),
+    pageToken=messages.StringField(3),
+)
+
+SUGGEST_REQUEST = endpoints.ResourceContainer(
+    message_types.VoidMessage,
+    prefix=messages.StringField(1),
+    limit=messages.IntegerField(2),
+)
+
+ARTICLE_CHANGES_REQUEST = endpoints.ResourceContainer(
+    message_types.VoidMessage,
+    sinceToken=messages.StringField(1),
+    limit=messages.IntegerField(2),
+)
+
 COMMENTS_BY_AUTHOR = endpoints.ResourceContainer(
     message_types.VoidMessage,
     websafeAuthorKey=messages.StringField(1),
@@ -163,18 +293,72 @@ class AcaApi(remote.Service):
                 mainEmail = user.email(),
             )
             author.put()
+            self._updateSuggestions([(author.displayName, 'AUTHOR', 1)])
 
         return author
 
 
+    def _getAuthorKeyByID(self, authorID):
+        """Return the Author key of authorID, or None; the lookup is cached."""
+        return self._getAuthorKeysByID([authorID]).get(authorID)
+
+
+    def _getAuthorKeysByID(self, authorIDs):
+        """Return {authorID: Author key} of the authorIDs that exist; the lookups
+            are cached, and the uncached authorIDs queried in parallel"""
+        # authorIDs never change, so their keys can be cached indefinitely
+        a_keys = dict((authorID, AUTHOR_KEYS[authorID])
+            for authorID in authorIDs if authorID in AUTHOR_KEYS)
+        missing = [authorID for authorID in authorIDs if authorID not in a_keys]
+        if not missing:
+            return a_keys
+
+        cached = memcache.get_multi([str(authorID) for authorID in missing],
+            key_prefix=MEMCACHE_AUTHOR_ID_PREFIX)
+        queries = dict((authorID, Author.query(Author.authorID==authorID).get_async(keys_only=True))
+            for authorID in missing if str(authorID) not in cached)
+        found = {}
+        for authorID in missing:
+            if authorID in queries:
+                a_key = queries[authorID].get_result()
+                if not a_key:
+                    continue
+                found[str(authorID)] = a_key.urlsafe()
+            else:
+                a_key = ndb.Key(urlsafe=cached[str(authorID)])
+            if len(AUTHOR_KEYS) >= AUTHOR_KEYS_MAX:
+                AUTHOR_KEYS.clear()
+            AUTHOR_KEYS[authorID] = a_keys[authorID] = a_key
+        if found:
+            memcache.set_multi(found, key_prefix=MEMCACHE_AUTHOR_ID_PREFIX)
+        return a_keys
+
+
+    def _getAuthorByID(self, authorID):
+        """Return Author by authorID, or None, from the entity cache; for reads
+            only, updates get the Author in a transaction"""
+        a_key = self._getAuthorKeyByID(authorID)
+        return entitycache.get(a_key) if a_key else None
+
+
     def _updateProfile(self, author, request):
         """Update author profile."""
+        displayName = getattr(request, 'displayName', None)
+        if displayName and displayName != author.displayName:
+            self._updateSuggestions([(author.displayName, 'AUTHOR', -1),
+                (displayName, 'AUTHOR', 1)])
+        changed = False
         for field in ('displayName', 'mainEmail', 'organizations', 'userRights'):
             if hasattr(request, field):
                 val = getattr(request, field)
                 if val:
                     setattr(author, field, val)
-                    author.put()
+                    changed = True
+        # one put for all changed fields
+        if changed:
+            author.version += 1
+            author.put()
+            entitycache.invalidate('Author')
         return self._copyAuthorToForm(author)
 
 
@@ -230,8 +414,9 @@ class AcaApi(remote.Service):
             authorName = author.displayName
             authorID = author.authorID
         else:
-            authorName = article.key.parent().get().displayName
-            authorID = article.key.parent().get().authorID
+            author = entitycache.get(article.key.parent())
+            authorName = author.displayName
+            authorID = author.authorID
 
         for field in af.all_fields():
             if hasattr(article, field.name):
@@ -256,6 +441,22 @@ class AcaApi(remote.Service):
         af.check_initialized()
         return af
 
+    def _renderArticle(self, article):
+        """Store safe HTML of an Article's content and embed code, so reads don't render"""
+        article.contentHtml = render.renderContent(article.content)
+        article.embedHtml = render.renderEmbed(article.embed)
+        article.htmlVersion = render.HTML_VERSION
+
+
+    def _copyArticlesToForms(self, articles):
+        """Copy Articles to ArticleForms, getting their Authors in one batch."""
+        authors = dict((author.key, author) for author in
+            entitycache.get_multi(list(set(article.key.parent() for article in articles))) if author)
+
+        with tracing.Span('copy %d ArticleForms' % len(articles)):
+            return [self._copyArticleToForm(article, author=authors[article.key.parent()])
+                for article in articles if article.key.parent() in authors]
+
     @endpoints.method(ArticleUpdateForm, ArticleForm, path='article',
             http_method='POST', name='createArticle')
     def createArticle(self, request):
@@ -266,62 +467,148 @@ class AcaApi(remote.Service):
                 raise endpoints.BadRequestException("Article '%s' field required" % required)
 
         # copy ArticleForm/ProtoRPC Message into dict
-        data = {field.name: getattr(request, field.name) for field in request.all_fields()}
+        data = {field.name: getattr(request, field.name) for field in request.all_fields()
+            if field.name in Article._properties}
 
         if data['view'] == None:
             del data['view']
+        elif data['view'] == View.DELETED:
+            raise endpoints.BadRequestException('An Article can\'t be created deleted.')
         else:
             data['view'] = str(data['view'])
 
         author = self._getAuthorFromUser()
+        self._checkRateLimit('createArticle', author)
         data['authorName'] = author.displayName
 
-        article_id = Article.allocate_ids(size=1, parent=author.key)[0]
-        article_key = ndb.Key(Article, article_id, parent=author.key)
-        data['key'] = article_key
-
-        # create Article
-        article_key = Article(**data).put()
+        # create Article; the put assigns its ID, so no separate allocate_ids call
+        article = Article(parent=author.key, **data)
+        self._renderArticle(article)
 
         # send email to author confirming creation of Article
-        taskqueue.add(params={'email': author.mainEmail,
-            'ArticleInfo': repr(request)},
+        task = taskqueue.Task(params={'email': author.mainEmail,
+            'articleInfo': repr(request)},
             url='/tasks/send_confirmation_email'
         )
+        self._putArticle(article, [task]).get_result()
+        self._adjustArchiveCalendar(None, article.publishedMonth)
+        self._queueRelatedUpdate(article, [])
+        self._invalidateCache('allArticles')
+
+        # the put filled in key and dateCreated, so no need to read it back
+        return self._copyArticleToForm(article, author=author)
+
+
+    @ndb.transactional_tasklet
+    def _putArticle(self, article, tasks):
+        """Put a new Article, count it if published and enqueue its tasks
+            concurrently, in one transaction on the Author's entity group"""
+        futures = [article.put_async()] + [task.add_async(transactional=True) for task in tasks]
+        if article.view == 'PUBLISHED':
+            futures.append(self._adjustPublishedCount(article.key.parent(), 1))
+        results = yield futures
+        raise ndb.Return(results[0])
 
-        return self._copyArticleToForm(article_key.get(), author=author)
 
     @endpoints.method(ARTICLE_UPDATE_REQUEST, ArticleForm,
             path='article/{websafeArticleKey}',
             http_method='PUT', name='updateMyArticle')
-    @ndb.transactional(xg=True)
     def updateMyArticle(self, request):
         """Update Article object, returning ArticleForm/request."""
 
         author = self._getAuthorFromUser()
+        article_key = self._checkKey(request.websafeArticleKey, 'Article')
 
-        # get existing Article
-        article = self._checkKey(request.websafeArticleKey, 'Article').get()
-
-        # check that user is owner
-        if author.key != article.key.parent():
+        # check that user is owner; Articles are children of their Author
+        if author.key != article_key.parent():
             raise endpoints.ForbiddenException(
                 'Only the owner can update the Article.')
 
-        # copy ArticleForm/ProtoRPC Message into dict
-        data = {field.name: getattr(request, field.name) for field in request.all_fields()}
+        if request.view == View.DELETED:
+            raise endpoints.BadRequestException('Use deleteMyArticle to delete an Article.')
+
+        article, previous = self._updateArticle(article_key, request)
+        self._articleChanged(article, previous)
+        return self._copyArticleToForm(article, author=author)
+
+
+    @endpoints.method(ARTICLE_BY_KEY_GET_REQUEST, BooleanMessage,
+            path='article/{websafeArticleKey}',
+            http_method='DELETE', name='deleteMyArticle')
+    def deleteMyArticle(self, request):
+        """Delete Article and its comments; favorites and featured lists drop it in the background"""
+
+        author = self._getAuthorFromUser()
+        article_key = self._checkKey(request.websafeArticleKey, 'Article')
+
+        if author.key != article_key.parent():
+            raise endpoints.ForbiddenException(
+                'Only the owner can delete the Article.')
+
+        article, previous = self._deleteArticle(article_key)
+        self._articleChanged(article, previous)
+        return BooleanMessage(data=True)
+
+
+    @ndb.transactional()
+    def _deleteArticle(self, article_key):
+        """Replace an Article by a DELETED tombstone without content.
+            Returns the tombstone and a dict of the Article's previous values"""
+        article = self._checkArticle(article_key.get(), article_key.urlsafe())
+        previous = article.to_dict()
+
+        tombstone = Article(key=article_key, view='DELETED', dateCreated=article.dateCreated,
+            dateModified=datetime.now(), version=article.version + 1)
+        self._renderArticle(tombstone)
+        tombstone.put()
+        if previous['view'] == 'PUBLISHED':
+            self._adjustPublishedCount(article_key.parent(), -1).get_result()
+        return tombstone, previous
+
+
+    def _articleChanged(self, article, previous):
+        """Update what derives from an Article after it was updated or deleted"""
+        entitycache.invalidate('Article')
+        self._adjustArchiveCalendar(previous['publishedMonth'], article.publishedMonth)
+        old_tags = previous['tags'] if previous['view'] == 'PUBLISHED' else []
+        self._queueRelatedUpdate(article, old_tags)
+
+        # retracted and deleted articles lose their comments and every reference to them
+        if article.view in ('RETRACTED', 'DELETED') and previous['view'] != article.view:
+            self._queueArticleCleanup(article.key)
+        self._invalidateCache('allArticles')
+        self._invalidateCache('featuredArticles')
+
+
+    @ndb.transactional()
+    def _updateArticle(self, article_key, request):
+        """Compare-and-set update of an Article, inside its own entity group only.
+            Returns the Article and a dict of its previous values"""
+        article = self._checkArticle(article_key.get(), request.websafeArticleKey)
+        self._checkVersion(article, request.expectedVersion)
+        previous = article.to_dict()
+        was_published = article.view == 'PUBLISHED'
 
         # Not getting all the fields, so don't create a new object; just
         # copy relevant fields from ArticleForm to Article object
         for field in request.all_fields():
             data = getattr(request, field.name)
-            # only copy fields where we get data
-            if data not in (None, []):
-                # write to Article object
+            # only copy Article fields where we get data
+            if field.name in Article._properties and data not in (None, []):
+                if field.name == 'view':
+                    data = str(data)
                 setattr(article, field.name, data)
 
+        self._renderArticle(article)
+        article.version += 1
+        article.dateModified = datetime.now()
         article.put()
-        return self._copyArticleToForm(article, author=author)
+
+        # Articles are in their Author's entity group, so the count stays in this transaction
+        if was_published != (article.view == 'PUBLISHED'):
+            self._adjustPublishedCount(article_key.parent(),
+                1 if article.view == 'PUBLISHED' else -1).get_result()
+        return article, previous
 
 
     @endpoints.method(message_types.VoidMessage, ArticleForms,
@@ -340,7 +627,8 @@ class AcaApi(remote.Service):
 
         # return set of ArticleForm objects per Article
         return ArticleForms(
-            items=[self._copyArticleToForm(article, author) for article in articles]
+            items=[self._copyArticleToForm(article, author) for article in articles
+                if article.view != 'DELETED']
         )
 
 
@@ -351,9 +639,7 @@ class AcaApi(remote.Service):
         """Return published articles created by author (key or authorID), newest first"""
 
         #try by authorID first
-        author = Author.query()\
-            .filter(Author.authorID==request.websafeAuthorKey)\
-            .get()\
+        author = self._getAuthorByID(request.websafeAuthorKey)\
             or self._checkKey(request.websafeAuthorKey, 'Author').get()
 
         articles = Article.query(ancestor=author.key)\
@@ -371,7 +657,11 @@ class AcaApi(remote.Service):
             http_method='GET', name='getAllArticles')
     def getAllArticles(self, request):
         """Return all published articles, newest first"""
+        return self._cachedResponse('allArticles')
+
 
+    def _buildAllArticles(self):
+        """Build ArticleForms of all published articles, newest first"""
         articles = Article.query()\
             .filter(Article.view=='PUBLISHED')\
             .order(-Article.dateCreated)
@@ -386,15 +676,17 @@ class AcaApi(remote.Service):
             http_method='GET', name='getFeaturedArticles')
     def getFeaturedArticles(self, request):
         """Return featured articles (Favorites of authorID 0)"""
+        return self._cachedResponse('featuredArticles')
 
-        author = Author.query()\
-            .filter(Author.authorID=='0')\
-            .get()
+
+    def _buildFeaturedArticles(self):
+        """Build ArticleForms of featured articles (Favorites of authorID 0)"""
+        author = self._getAuthorByID('0')
+        articles = entitycache.get_multi([ndb.Key(urlsafe=key) for key in author.favoriteArticles])
 
         # return set of ArticleForm objects per favorite article
-        return ArticleForms(
-            items=[self._copyArticleToForm(ndb.Key(urlsafe=key).get()) for key in author.favoriteArticles]
-        )
+        return ArticleForms(items=self._copyArticlesToForms(
+            [article for article in articles if article]))
 
     @endpoints.method(message_types.VoidMessage, KeyForms,
             path='featuredArticleKeys',
@@ -402,9 +694,7 @@ class AcaApi(remote.Service):
     def getFeaturedArticleKeys(self, request):
         """Return websafe keys for all featured articles (Favorites of authorID 0)"""
 
-        author = Author.query()\
-            .filter(Author.authorID=='0')\
-            .get()
+        author = self._getAuthorByID('0')
 
         # return set of ArticleForm objects per favorite article
         return KeyForms(
@@ -430,13 +720,9 @@ class AcaApi(remote.Service):
                 )
         self._checkKey(request.websafeArticleKey, 'Article')
 
-        favoritesAuthor = Author.query(Author.authorID=='0').get()
-
-        if request.websafeArticleKey in favoritesAuthor.favoriteArticles:
-            raise endpoints.BadRequestException("Article is already a featured article")
-
-        favoritesAuthor.favoriteArticles.append(request.websafeArticleKey)
-        favoritesAuthor.put()
+        self._updateFeatured(self._getAuthorKeyByID('0'), request.websafeArticleKey, add=True)
+        entitycache.invalidate('Author')
+        self._invalidateCache('featuredArticles')
 
         return BooleanMessage(data=True)
 
@@ -460,19 +746,29 @@ class AcaApi(remote.Service):
                 )
         self._checkKey(request.websafeArticleKey, 'Article')
 
-        favoritesAuthor = Author.query()\
-            .filter(Author.authorID=='0')\
-            .get()
+        self._updateFeatured(self._getAuthorKeyByID('0'), request.websafeArticleKey, add=False)
+        entitycache.invalidate('Author')
+        self._invalidateCache('featuredArticles')
 
-        if not request.websafeArticleKey in favoritesAuthor.favoriteArticles:
-            raise endpoints.NotFoundException("Article is not a featured article")
+        return BooleanMessage(data=True)
 
-        # find and delete the article key
-        idx = favoritesAuthor.favoriteArticles.index(request.websafeArticleKey)
-        del favoritesAuthor.favoriteArticles[idx]
-        favoritesAuthor.put()
 
-        return BooleanMessage(data=True)
+    @ndb.transactional()
+    def _updateFeatured(self, featured_key, websafeArticleKey, add):
+        """Add or remove an article in the featured articles, read from the datastore"""
+        favoritesAuthor = featured_key.get()
+
+        if add:
+            if websafeArticleKey in favoritesAuthor.favoriteArticles:
+                raise endpoints.BadRequestException("Article is already a featured article")
+            favoritesAuthor.favoriteArticles.append(websafeArticleKey)
+        else:
+            if not websafeArticleKey in favoritesAuthor.favoriteArticles:
+                raise endpoints.NotFoundException("Article is not a featured article")
+            favoritesAuthor.favoriteArticles.remove(websafeArticleKey)
+
+        favoritesAuthor.version += 1
+        favoritesAuthor.put()
 
 
     @endpoints.method(ARTICLE_BY_KEY_GET_REQUEST, ArticleForm,
@@ -481,9 +777,12 @@ class AcaApi(remote.Service):
     def getArticleByKey(self, request):
         """Return requested article (by websafeArticleKey)."""
         # checks if websafeArticleKey is an Article key and it exists
-        article = self._checkKey(request.websafeArticleKey, 'Article').get()
+        article = self._checkArticle(
+            entitycache.get(self._checkKey(request.websafeArticleKey, 'Article')),
+            request.websafeArticleKey)
+        self._recordView(article.key)
 
-        return self._copyArticleToForm(article, author=article.key.parent().get())
+        return self._copyArticleToForm(article)
 
 
     @endpoints.method(ARTICLE_GET_REQUEST, ArticleForm,
@@ -492,20 +791,77 @@ class AcaApi(remote.Service):
     def getArticle(self, request):
         """ Return requested article by Author/Article ID.  
             A shorter URL form for published links"""
-        author = Author.query()\
-            .filter(Author.authorID==request.authorID)\
-            .get()
+        author = self._getAuthorByID(request.authorID)
 
         if not author:
             raise endpoints.UnauthorizedException('Invalid Author ID (%s)' % request.authorID)
 
-        article = ndb.Key(Article, int(request.articleID), parent=author.key).get()
-        if not article:
+        article = entitycache.get(ndb.Key(Article, int(request.articleID), parent=author.key))
+        if not article or article.view == 'DELETED':
             raise endpoints.UnauthorizedException('Invalid Article ID (%s) for %s' % (request.articleID, author.displayName))
+        self._recordView(article.key)
 
         return self._copyArticleToForm(article, author=author)
 
 
+    @endpoints.method(ArticleRefForms, ArticleResultForms,
+            path='articles/batch',
+            http_method='POST', name='getArticlesBatch')
+    def getArticlesBatch(self, request):
+        """Return articles by websafeArticleKey or authorID/articleID, in request order.
+            Items that can't be resolved carry an error instead of an article"""
+
+        if len(request.items) > ARTICLE_BATCH_MAX:
+            raise endpoints.BadRequestException(
+                'At most %d articles can be requested at once' % ARTICLE_BATCH_MAX)
+
+        # resolve authorIDs through the cached authorID lookups
+        author_ids = set(ref.authorID for ref in request.items
+            if not ref.websafeArticleKey and ref.authorID)
+        author_keys = self._getAuthorKeysByID(list(author_ids))
+
+        article_keys = [self._articleKeyFromRef(ref, author_keys) for ref in request.items]
+        valid_keys = [key for key in article_keys if isinstance(key, ndb.Key)]
+        articles = dict(zip(valid_keys, entitycache.get_multi(valid_keys)))
+
+        # get the parent Authors in one batch
+        authors = {}
+        author_keys = list(set(key.parent() for key, article in articles.items() if article))
+        for author in entitycache.get_multi(author_keys):
+            if author:
+                authors[author.key] = author
+
+        items = []
+        for ref, key in zip(request.items, article_keys):
+            if not isinstance(key, ndb.Key):
+                items.append(ArticleResultForm(error=key))
+            elif not articles[key] or articles[key].view == 'DELETED' or key.parent() not in authors:
+                items.append(ArticleResultForm(error='No Article found for %s' % (
+                    ref.websafeArticleKey or '%s/%s' % (ref.authorID, ref.articleID))))
+            else:
+                items.append(ArticleResultForm(
+                    article=self._copyArticleToForm(articles[key], author=authors[key.parent()])))
+
+        return ArticleResultForms(items=items)
+
+
+    def _articleKeyFromRef(self, ref, author_keys):
+        """Return Article key for an ArticleRefForm, or an error string"""
+        if ref.websafeArticleKey:
+            key = self._ndbKey(urlsafe=ref.websafeArticleKey)
+            if key == 'Invalid Key' or not key or key.kind() != 'Article':
+                return 'Invalid Article key: %s' % ref.websafeArticleKey
+            return key
+
+        if ref.authorID not in author_keys:
+            return 'Invalid Author ID (%s)' % ref.authorID
+
+        if not ref.articleID or not ref.articleID.isdigit():
+            return 'Invalid Article ID (%s)' % ref.articleID
+
+        return ndb.Key(Article, int(ref.articleID), parent=author_keys[ref.authorID])
+
+
     def _getQuery(self, request):
         """Return formatted query from the submitted filters."""
         q = Article.query()
@@ -560,6 +916,7 @@ class AcaApi(remote.Service):
             name='queryArticles')
     def queryArticles(self, request):
         """Query for articles."""
+        self._checkRateLimit('queryArticles')
         articles = self._getQuery(request)
 
         # need to fetch organiser displayName from authors
@@ -579,27 +936,640 @@ class AcaApi(remote.Service):
         )
 
 
+# - - - Archive - - - - - - - - - - - - - - - - - - - - - -
+
+    @endpoints.method(ARTICLES_BY_PERIOD, ArticlePageForms,
+            path='articlesByPeriod/{year}',
+            http_method='GET', name='getArticlesByPeriod')
+    def getArticlesByPeriod(self, request):
+        """Return articles published in a year, or a month of it, newest first.
+            Pages end at a whole month; pageToken continues from nextPageToken"""
+        if request.month:
+            if not 1 <= request.month <= 12:
+                raise endpoints.BadRequestException('Invalid month (%s)' % request.month)
+            first = last = '%04d-%02d' % (request.year, request.month)
+        else:
+            first, last = '%04d-01' % request.year, '%04d-12' % request.year
+
+        # the token is the month to continue from, with a cursor within a large month
+        month, _, cursor = (request.pageToken or '').partition(':')
+        if month:
+            if not first <= month <= last:
+                raise endpoints.BadRequestException('Invalid pageToken (%s)' % request.pageToken)
+            last = month
+
+        articles, token = [], None
+        if not cursor:
+            articles = Article.query(Article.publishedMonth>=first, Article.publishedMonth<=last)\
+                .order(-Article.publishedMonth)\
+                .fetch(ARCHIVE_PERIOD_MAX + 1)
+            if len(articles) > ARCHIVE_PERIOD_MAX:
+                # leave out the month the page would cut; the next page starts with it
+                token = articles[ARCHIVE_PERIOD_MAX].publishedMonth
+                articles = [article for article in articles if article.publishedMonth > token]
+
+        if cursor or token and not articles:
+            # a month with more articles than a page is paged in key order
+            month = last if cursor else token
+            articles, next_cursor, more = Article.query(Article.publishedMonth==month)\
+                .fetch_page(ARCHIVE_PERIOD_MAX,
+                    start_cursor=ndb.Cursor(urlsafe=cursor) if cursor else None)
+            if more and next_cursor:
+                token = '%s:%s' % (month, next_cursor.urlsafe())
+            elif month > first:
+                token = '%s-%02d' % (month[:4], int(month[5:]) - 1)
+            else:
+                token = None
+
+        # a page holds few articles, so sort them here rather than in a composite index
+        articles.sort(key=lambda article: article.dateCreated, reverse=True)
+
+        return ArticlePageForms(items=self._copyArticlesToForms(articles),
+            nextPageToken=token)
+
+
+    @endpoints.method(message_types.VoidMessage, MonthCountForms,
+            path='archiveCalendar',
+            http_method='GET', name='getArchiveCalendar')
+    def getArchiveCalendar(self, request):
+        """Return the number of published articles per month"""
+        counts = memcache.get(MEMCACHE_ARCHIVE_CALENDAR_KEY)
+        if counts is None:
+            calendar = ndb.Key(ArchiveCalendar, 'calendar').get()
+            counts = calendar.counts if calendar else {}
+            memcache.set(MEMCACHE_ARCHIVE_CALENDAR_KEY, counts, time=ARCHIVE_CALENDAR_TTL)
+
+        return MonthCountForms(
+            items=[MonthCountForm(month=month, count=counts[month]) for month in sorted(counts)]
+        )
+
+
+    def _adjustArchiveCalendar(self, old_month, new_month):
+        """Move an article's count from old_month to new_month in the archive calendar;
+            the cached counts are dropped, as concurrent sets could land out of order"""
+        if old_month == new_month:
+            return
+        deltas = {}
+        if old_month:
+            deltas[old_month] = -1
+        if new_month:
+            deltas[new_month] = 1
+        self._updateArchiveCalendar(deltas)
+        memcache.delete(MEMCACHE_ARCHIVE_CALENDAR_KEY)
+
+
+    @ndb.transactional()
+    def _updateArchiveCalendar(self, deltas):
+        """Add deltas to the archive calendar counts"""
+        key = ndb.Key(ArchiveCalendar, 'calendar')
+        calendar = key.get() or ArchiveCalendar(key=key, counts={})
+        for month, delta in deltas.items():
+            calendar.counts[month] = calendar.counts.get(month, 0) + delta
+            if calendar.counts[month] <= 0:
+                del calendar.counts[month]
+        calendar.put()
+        return calendar
+
+
+    def _backfillArticles(self, cursor=None, counts=None):
+        """Re-put a batch of Articles to store derived properties, then chain the next batch.
+            The archive calendar is rebuilt from the counts carried along the chain"""
+        counts = counts or {}
+        articles, cursor, more = Article.query().fetch_page(BACKFILL_BATCH,
+            start_cursor=ndb.Cursor(urlsafe=cursor) if cursor else None)
+
+        ndb.put_multi(articles)
+        entitycache.invalidate('Article')
+        for article in articles:
+            if article.publishedMonth:
+                counts[article.publishedMonth] = counts.get(article.publishedMonth, 0) + 1
+            self._queueRelatedUpdate(article, [])
+
+        if more and cursor:
+            taskqueue.add(params={'cursor': cursor.urlsafe(), 'counts': json.dumps(counts)},
+                url='/tasks/backfill_articles'
+            )
+        else:
+            ArchiveCalendar(key=ndb.Key(ArchiveCalendar, 'calendar'), counts=counts).put()
+            memcache.delete(MEMCACHE_ARCHIVE_CALENDAR_KEY)
+
+
+    def _backfillHtml(self, kind_index=0, cursor=None):
+        """Render safe HTML for a batch of Articles or Comments stored without it,
+            or by older rules, then chain the next batch"""
+        kind = HTML_KINDS[kind_index]
+        entities, cursor, more = kind.query().fetch_page(BACKFILL_BATCH,
+            start_cursor=ndb.Cursor(urlsafe=cursor) if cursor else None)
+
+        stale = [entity for entity in entities if entity.htmlVersion != render.HTML_VERSION]
+        for entity in stale:
+            if kind is Article:
+                self._renderArticle(entity)
+            else:
+                self._renderComment(entity)
+        ndb.put_multi(stale)
+        if stale and kind is Article:
+            entitycache.invalidate('Article')
+
+        if not (more and cursor):
+            kind_index, cursor = kind_index + 1, None
+        if kind_index < len(HTML_KINDS):
+            taskqueue.add(params={'kind': kind_index, 'cursor': cursor.urlsafe() if cursor else ''},
+                url='/tasks/backfill_html'
+            )
+        else:
+            self._invalidateCache('allArticles')
+            self._invalidateCache('featuredArticles')
+            self._invalidateCache('trendingArticles')
+
+
+    @endpoints.method(ARTICLE_CHANGES_REQUEST, ArticleChangeForms,
+            path='articleChanges',
+            http_method='GET', name='getArticleChanges')
+    def getArticleChanges(self, request):
+        """Return articles changed since sinceToken, oldest change first.
+            Pass back the returned sinceToken to continue; no token starts from the beginning"""
+        try:
+            cursor = ndb.Cursor(urlsafe=request.sinceToken) if request.sinceToken else None
+        except Exception:
+            raise endpoints.BadRequestException('Invalid sinceToken: %s' % request.sinceToken)
+
+        limit = min(request.limit or CHANGES_PAGE_MAX, CHANGES_PAGE_MAX)
+        articles, next_cursor, more = Article.query()\
+            .order(Article.dateModified)\
+            .fetch_page(limit, start_cursor=cursor)
+
+        items = []
+        for article in articles:
+            change = ArticleChangeForm(
+                websafeArticleKey=article.key.urlsafe(),
+                dateModified=str(article.dateModified),
+                view=getattr(View, article.view),
+                removed=article.view != 'PUBLISHED',
+            )
+            # only published articles are visible, so removed ones carry no content
+            if not change.removed:
+                change.title = article.title
+                change.authorName = article.authorName
+                change.tags = article.tags
+            items.append(change)
+
+        return ArticleChangeForms(
+            items=items,
+            sinceToken=next_cursor.urlsafe() if next_cursor else request.sinceToken,
+            more=more,
+        )
+
+
+# - - - Statistics - - - - - - - - - - - - - - - - - - - - -
+
+    @endpoints.method(message_types.VoidMessage, ArchiveStatsForm,
+            path='archiveStats',
+            http_method='GET', name='getArchiveStats')
+    def getArchiveStats(self, request):
+        """Return archive statistics from the last stats job, if user is ADMINISTRATOR"""
+        user_author = self._getAuthorFromUser()
+        if getattr(UserRights, user_author.userRights) < UserRights.ADMINISTRATOR:
+            raise endpoints.ForbiddenException(
+                "Only an administrator can view archive statistics.")
+
+        return self._cachedResponse('archiveStats')
+
+
+    def _buildArchiveStats(self):
+        """Build ArchiveStatsForm from the stored archive stats"""
+        current = ndb.Key(ArchiveStats, 'current').get()
+        if not current:
+            return ArchiveStatsForm()
+        stats = current.stats
+
+        def counts(name, by_count=False):
+            items = sorted(stats[name].items(), key=lambda item: -item[1] if by_count else item[0])
+            return [CountForm(name=key, count=count) for key, count in items]
+
+        return ArchiveStatsForm(
+            articles=stats['articles'],
+            comments=stats['comments'],
+            authors=stats['authors'],
+            byView=counts('byView'),
+            byMonth=counts('byMonth'),
+            byTag=counts('byTag', by_count=True),
+            byRights=counts('byRights'),
+            byAuthor=[AuthorStatsForm(authorID=authorID, displayName=author.get('displayName'),
+                articles=author.get('articles', 0), comments=author.get('comments', 0))
+                for authorID, author in sorted(stats['byAuthor'].items())],
+            dateComputed=str(current.dateComputed),
+        )
+
+
+    def _collectStats(self, kind_index=0, cursor=None, run=None, batch=0):
+        """Start a stats run, or count one batch of a kind of a run into the pending stats,
+            then chain the next batch. The pending stats replace the current ones once
+            all kinds are counted"""
+        if not run:
+            ndb.transaction(self._startStats)
+            return
+
+        pending = ndb.Key(ArchiveStats, 'pending').get()
+        # a task of a run since replaced or finished, or delivered again once counted
+        if not pending or pending.stats.get('run') != run or pending.stats.get('batch') != batch:
+            return
+        stats = pending.stats
+
+        def count(name, key):
+            stats[name][key] = stats[name].get(key, 0) + 1
+
+        kind = STATS_KINDS[kind_index]
+        entities, cursor, more = kind.query().fetch_page(STATS_BATCH,
+            start_cursor=ndb.Cursor(urlsafe=cursor) if cursor else None)
+
+        for entity in entities:
+            if kind is Article:
+                stats['articles'] += 1
+                count('byView', entity.view)
+                if entity.dateCreated:
+                    count('byMonth', entity.dateCreated.strftime('%Y-%m'))
+                for tag in set(entity.tags):
+                    count('byTag', tag)
+                # Articles only know their Author key; counted per authorID in the Author pass
+                count('articlesByAuthorKey', entity.key.parent().urlsafe())
+            elif kind is Comment:
+                stats['comments'] += 1
+                author = stats['byAuthor'].setdefault(entity.authorID, {})
+                author['comments'] = author.get('comments', 0) + 1
+            else:
+                stats['authors'] += 1
+                count('byRights', entity.userRights)
+                author = stats['byAuthor'].setdefault(entity.authorID, {})
+                author['displayName'] = entity.displayName
+                author['articles'] = stats['articlesByAuthorKey'].pop(entity.key.urlsafe(), 0)
+
+        if not (more and cursor):
+            kind_index, cursor = kind_index + 1, None
+
+        stats['batch'] += 1
+        if kind_index < len(STATS_KINDS):
+            ndb.transaction(lambda: self._queueStatsBatch(stats, kind_index, cursor))
+        else:
+            for name in ('articlesByAuthorKey', 'run', 'batch'):
+                del stats[name]
+            ArchiveStats(id='current', stats=stats).put()
+            pending.key.delete()
+            self._invalidateCache('archiveStats')
+
+
+    def _startStats(self):
+        """Start a stats run unless one is in progress; call in a transaction"""
+        pending = ndb.Key(ArchiveStats, 'pending').get()
+        if pending and pending.dateComputed and \
+                (datetime.now() - pending.dateComputed).total_seconds() < STATS_STALLED:
+            return
+        stats = {'articles': 0, 'comments': 0, 'authors': 0, 'byView': {}, 'byMonth': {},
+            'byTag': {}, 'byRights': {}, 'byAuthor': {}, 'articlesByAuthorKey': {},
+            'run': '%x' % random.getrandbits(32), 'batch': 0}
+        self._queueStatsBatch(stats, 0, None)
+
+
+    def _queueStatsBatch(self, stats, kind_index, cursor):
+        """Store the pending stats and queue the batch counted next; call in a
+            transaction, so a batch is queued exactly when its stats are stored"""
+        ArchiveStats(id='pending', stats=stats).put()
+        taskqueue.add(params={'kind': kind_index, 'cursor': cursor.urlsafe() if cursor else '',
+            'run': stats['run'], 'batch': stats['batch']},
+            url='/tasks/collect_stats', transactional=True
+        )
+
+
+# - - - Related articles - - - - - - - - - - - - - - - - - - -
+
+    @endpoints.method(ARTICLE_BY_KEY_GET_REQUEST, ArticleForms,
+            path='article/{websafeArticleKey}/related',
+            http_method='GET', name='getRelatedArticles')
+    def getRelatedArticles(self, request):
+        """Return published articles sharing the most tags with an article"""
+        article_key = self._checkKey(request.websafeArticleKey, 'Article')
+        related = ndb.Key(RelatedArticles, 'related', parent=article_key).get()
+        if not related:
+            return ArticleForms()
+
+        articles = [article for article in ndb.get_multi(related.articles)
+            if article and article.view == 'PUBLISHED']
+        return ArticleForms(items=self._copyArticlesToForms(articles))
+
+
+    def _queueRelatedUpdate(self, article, old_tags):
+        """Queue a related articles update if an article's published tags changed"""
+        tags = article.tags if article.view == 'PUBLISHED' else []
+        if set(tags) != set(old_tags):
+            taskqueue.add(params={'websafeArticleKey': article.key.urlsafe(),
+                'oldTags': json.dumps(old_tags)},
+                url='/tasks/update_related',
+                queue_name=RELATED_QUEUE
+            )
+
+
+    def _updateRelatedArticles(self, websafeArticleKey, old_tags):
+        """Update the tag index for an article, then the related articles of it
+            and of its best matches, which are the ones most likely to list it"""
+        article_key = ndb.Key(urlsafe=websafeArticleKey)
+        article = article_key.get()
+        tags = set(tag for tag in (article.tags if article and article.view == 'PUBLISHED' else []) if tag)
+        old_tags = set(tag for tag in old_tags if tag)
+
+        changes = []
+        for tag in old_tags - tags:
+            if self._updateTagIndex(tag, article_key, add=False):
+                changes.append((tag, 'TAG', -1))
+        for tag in tags - old_tags:
+            if self._updateTagIndex(tag, article_key, add=True):
+                changes.append((tag, 'TAG', 1))
+        if changes:
+            self._updateSuggestions(changes)
+
+        if not tags:
+            ndb.Key(RelatedArticles, 'related', parent=article_key).delete()
+            return
+
+        indexes = {}
+        related = self._findRelatedArticles(article_key, tags, indexes)
+        entities = [RelatedArticles(id='related', parent=article_key, articles=related)]
+        for neighbor in ndb.get_multi(related):
+            if neighbor and neighbor.view == 'PUBLISHED':
+                entities.append(RelatedArticles(id='related', parent=neighbor.key,
+                    articles=self._findRelatedArticles(neighbor.key, neighbor.tags, indexes)))
+        ndb.put_multi(entities)
+
+
+    @ndb.transactional()
+    def _updateTagIndex(self, tag, article_key, add):
+        """Add or remove an article key in the index of a tag, returning True if changed"""
+        index = TagIndex.get_by_id(tag) or TagIndex(id=tag)
+        if add and article_key not in index.articles:
+            index.articles.append(article_key)
+        elif not add and article_key in index.articles:
+            index.articles.remove(article_key)
+        else:
+            return False
+        index.put()
+        return True
+
+
+    def _findRelatedArticles(self, article_key, tags, indexes):
+        """Return keys of the articles sharing the most tags with an article.
+            Rare tags weigh more than common ones; indexes caches TagIndex by tag"""
+        missing = [tag for tag in set(tags) if tag and tag not in indexes]
+        for tag, index in zip(missing, ndb.get_multi([ndb.Key(TagIndex, tag) for tag in missing])):
+            indexes[tag] = index
+
+        scores = {}
+        for tag in set(tags):
+            index = indexes.get(tag)
+            if not index:
+                continue
+            weight = 1.0 / math.log(2 + len(index.articles))
+            for key in index.articles:
+                if key != article_key:
+                    scores[key] = scores.get(key, 0) + weight
+
+        return sorted(scores, key=lambda key: (-scores[key], key))[:RELATED_SIZE]
+
+
+# - - - Suggestions - - - - - - - - - - - - - - - - - - - - -
+
+    @endpoints.method(SUGGEST_REQUEST, SuggestionForms,
+            path='suggest',
+            http_method='GET', name='suggest')
+    def suggest(self, request):
+        """Return tags and author names starting with prefix, most used first"""
+        prefix = (request.prefix or '').strip().lower()
+        if not prefix:
+            return SuggestionForms()
+
+        entries = self._getSuggestIndex()
+        matches = []
+        i = bisect.bisect_left(entries, (prefix,))
+        while i < len(entries) and entries[i][0].startswith(prefix) and len(matches) < SUGGEST_SCAN:
+            matches.append(entries[i])
+            i += 1
+        matches.sort(key=lambda entry: -entry[3])
+
+        limit = min(request.limit or SUGGEST_SIZE, SUGGEST_SIZE)
+        return SuggestionForms(
+            items=[SuggestionForm(text=text, kind=kind, count=count)
+                for term, kind, text, count in matches[:limit]]
+        )
+
+
+    def _getSuggestIndex(self):
+        """Return the suggest index, checking memcache for a newer one now and then.
+            When memcache has none, a task rebuilds it and this instance's index
+            is served until then"""
+        now = time.time()
+        if now - SUGGEST_INDEX['checked'] < SUGGEST_CHECK_INTERVAL:
+            return SUGGEST_INDEX['entries']
+        SUGGEST_INDEX['checked'] = now
+
+        generation = memcache.get(MEMCACHE_SUGGEST_GENERATION_KEY)
+        if generation is None or generation != SUGGEST_INDEX['generation']:
+            entries = memcache.get(MEMCACHE_SUGGEST_KEY)
+            if entries is None:
+                # one rebuild at a time, however many instances find it missing
+                if memcache.add(MEMCACHE_SUGGEST_REBUILD_KEY, 1, time=SUGGEST_REBUILD_LEASE):
+                    try:
+                        taskqueue.add(url='/tasks/rebuild_suggest')
+                    except taskqueue.Error:
+                        memcache.delete(MEMCACHE_SUGGEST_REBUILD_KEY)
+                return SUGGEST_INDEX['entries']
+            if generation is None:
+                generation = memcache.incr(MEMCACHE_SUGGEST_GENERATION_KEY, initial_value=0)
+            SUGGEST_INDEX['entries'] = entries
+            SUGGEST_INDEX['generation'] = generation
+
+        return SUGGEST_INDEX['entries']
+
+
+    def _rebuildSuggestIndex(self):
+        """Rebuild the shared suggest index from the datastore; instances pick it up
+            at their next check"""
+        try:
+            memcache.set(MEMCACHE_SUGGEST_KEY, self._buildSuggestIndex())
+            memcache.incr(MEMCACHE_SUGGEST_GENERATION_KEY, initial_value=0)
+        finally:
+            memcache.delete(MEMCACHE_SUGGEST_REBUILD_KEY)
+
+
+    def _buildSuggestIndex(self):
+        """Build the suggest index from the tag indexes and author names"""
+        changes = [(index.key.id(), 'TAG', len(index.articles)) for index in TagIndex.query()]
+        changes.extend((author.displayName, 'AUTHOR', 1)
+            for author in Author.query(projection=[Author.displayName]))
+        return self._applySuggestionChanges([], changes)
+
+
+    def _applySuggestionChanges(self, entries, changes):
+        """Return a copy of suggest index entries with (text, kind, count delta) changes applied"""
+        entries = list(entries)
+        for text, kind, delta in changes:
+            if not text:
+                continue
+            entry = (text.lower(), kind, text)
+            i = bisect.bisect_left(entries, entry)
+            if i < len(entries) and entries[i][:3] == entry:
+                count = entries[i][3] + delta
+                if count > 0:
+                    entries[i] = entry + (count,)
+                else:
+                    del entries[i]
+            elif delta > 0:
+                entries.insert(i, entry + (delta,))
+        return entries
+
+
+    def _updateSuggestions(self, changes):
+        """Apply (text, kind, count delta) changes to the shared and local suggest index"""
+        client = memcache.Client()
+        for attempt in range(SUGGEST_CAS_RETRIES):
+            entries = client.gets(MEMCACHE_SUGGEST_KEY)
+            if entries is None:
+                # nothing to update; it is rebuilt from the datastore when next needed
+                break
+            if client.cas(MEMCACHE_SUGGEST_KEY, self._applySuggestionChanges(entries, changes)):
+                break
+        else:
+            memcache.delete(MEMCACHE_SUGGEST_KEY)
+
+        memcache.incr(MEMCACHE_SUGGEST_GENERATION_KEY, initial_value=0)
+        SUGGEST_INDEX['entries'] = self._applySuggestionChanges(SUGGEST_INDEX['entries'], changes)
+
+
+# - - - Views - - - - - - - - - - - - - - - - - - - - - - -
+
+    def _recordView(self, article_key):
+        """Count an article view in memcache; the flush cron writes it to the datastore"""
+        self._bufferCount(MEMCACHE_VIEWS_BUFFER, article_key)
+
+
+    def _bufferCount(self, buffer, article_key):
+        """Add one to an article's count in a memcache buffer"""
+        wsak = article_key.urlsafe()
+        if memcache.incr('%s:%s' % (buffer, wsak), initial_value=0) == 1:
+            self._markBuffered(buffer, wsak)
+
+
+    def _markBuffered(self, buffer, wsak):
+        """Register an article with a buffered count in the buffer's next numbered slot"""
+        slot = memcache.incr(buffer + '_SLOTS', initial_value=0)
+        if slot:
+            memcache.set('%s_SLOT:%d' % (buffer, slot), wsak)
+
+
+    def _drainBuffer(self, buffer):
+        """Take the counts off a memcache buffer, returning them by websafeArticleKey"""
+        last = int(memcache.get(buffer + '_SLOTS') or 0)
+        first = int(memcache.get(buffer + '_FLUSHED') or 0) + 1
+        if last < first - 1:
+            # the slot counter was evicted and started over
+            first = 1
+
+        registered = memcache.get_multi([str(slot) for slot in range(first, last + 1)],
+            key_prefix=buffer + '_SLOT:')
+        # a numbered slot not set yet is being registered, and its count may already
+        # be live; stop before it, unless a drain stopped there before and its set was lost
+        unset = memcache.get(buffer + '_UNSET')
+        for slot in range(first, last + 1):
+            if str(slot) not in registered and slot != unset:
+                memcache.set(buffer + '_UNSET', slot)
+                last = slot - 1
+                break
+
+        slots = [str(slot) for slot in range(first, last + 1)]
+        wsaks = set(registered[slot] for slot in slots if slot in registered)
+        counts = {}
+        for wsak, count in memcache.get_multi(list(wsaks), key_prefix=buffer + ':').items():
+            if int(count) > 0:
+                counts[wsak] = int(count)
+
+        # take the drained counts off the buffer; articles counted meanwhile stay registered
+        remaining = memcache.offset_multi(dict((wsak, -count) for wsak, count in counts.items()),
+            key_prefix=buffer + ':')
+        for wsak, count in remaining.items():
+            if count:
+                self._markBuffered(buffer, wsak)
+        memcache.delete_multi(slots, key_prefix=buffer + '_SLOT:')
+        memcache.set(buffer + '_FLUSHED', last)
+        return counts
+
+
+    def _flushViews(self):
+        """Move buffered view counts into counter shards and trending scores"""
+        counts = self._drainBuffer(MEMCACHE_VIEWS_BUFFER)
+        if counts:
+            self._storeViews(counts)
+            self._invalidateCache('trendingArticles')
+
+
+    def _storeViews(self, counts):
+        """Add view counts (by websafeArticleKey) to shards and trending scores"""
+        # the flush cron is the only writer, so no transactions are needed here
+        shard_keys = [ndb.Key(ViewCounterShard,
+            '%s:%d' % (wsak, random.randint(0, VIEW_COUNTER_SHARDS - 1))) for wsak in counts]
+        trend_keys = [ndb.Key(ArticleTrend, wsak) for wsak in counts]
+        shards = ndb.get_multi(shard_keys)
+        trends = ndb.get_multi(trend_keys)
+
+        # a view now weighs 2**(t/half life); keep the log so scores stay small
+        growth = math.log(2) * time.time() / TRENDING_HALF_LIFE
+        entities = []
+        for wsak, shard_key, shard, trend_key, trend in \
+                zip(counts, shard_keys, shards, trend_keys, trends):
+            article_key = ndb.Key(urlsafe=wsak)
+            shard = shard or ViewCounterShard(key=shard_key, article=article_key)
+            shard.count += counts[wsak]
+
+            score = math.log(counts[wsak]) + growth
+            if trend:
+                high = max(score, trend.score)
+                score = high + math.log(math.exp(score - high) + math.exp(trend.score - high))
+            trend = trend or ArticleTrend(key=trend_key, article=article_key)
+            trend.score = score
+            entities.extend([shard, trend])
+
+        ndb.put_multi(entities)
+
+
+    @endpoints.method(message_types.VoidMessage, ArticleForms,
+            path='trendingArticles',
+            http_method='GET', name='getTrendingArticles')
+    def getTrendingArticles(self, request):
+        """Return most viewed published articles, recent views weighing most"""
+        return self._cachedResponse('trendingArticles')
+
+
+    def _buildTrendingArticles(self):
+        """Build ArticleForms of trending articles"""
+        trends = ArticleTrend.query()\
+            .order(-ArticleTrend.score)\
+            .fetch(TRENDING_SIZE)
+
+        articles = [article for article in ndb.get_multi([trend.article for trend in trends])
+            if article and article.view == 'PUBLISHED']
+
+        return ArticleForms(items=self._copyArticlesToForms(articles))
+
+
 # - - - Favorites - - - - - - - - - - - - - - - - - - - -
 
     @endpoints.method(ARTICLE_FAVORITES_REQUEST, BooleanMessage,
             path='articles/favorites/{websafeArticleKey}',
             http_method='PUT', name='addArticleToFavorites')
-    @ndb.transactional(xg=True)
     def addArticleToFavorites(self, request):
         """Add an article to the user's favorites list."""
         author = self._getAuthorFromUser() # get user Author
+        self._checkRateLimit('addArticleToFavorites', author)
         self._checkKey(request.websafeArticleKey, 'Article')
 
-        # check if user already added article otherwise add
-        if request.websafeArticleKey in author.favoriteArticles:
-            raise ConflictException(
-                "The article is already in %s's favorites list" % author.displayName
-                )
-        # add the article to the users favorites list
-        author.favoriteArticles.append(request.websafeArticleKey)
-
-        # write Author back to the datastore & return
-        author.put()
+        self._updateFavorites(author.key, request, add=True)
+        entitycache.invalidate('Author')
         return BooleanMessage(data=True)
 
 
@@ -611,18 +1581,36 @@ class AcaApi(remote.Service):
         author = self._getAuthorFromUser() # get user Author
         self._checkKey(request.websafeArticleKey, 'Article')
 
-        # check if article is in favorites
-        if not request.websafeArticleKey in author.favoriteArticles:
-            raise endpoints.NotFoundException(
-                "The article is not in %s's favorites list" % author.displayName
-                )
-        # find and delete the article key
-        idx = author.favoriteArticles.index(request.websafeArticleKey)
-        del author.favoriteArticles[idx]
+        self._updateFavorites(author.key, request, add=False)
+        entitycache.invalidate('Author')
+        return BooleanMessage(data=True)
+
 
-        # write Author back to the datastore & return
+    @ndb.transactional()
+    def _updateFavorites(self, author_key, request, add):
+        """Compare-and-set add or remove of an article in an Author's favorites"""
+        author = author_key.get()
+        self._checkVersion(author, request.expectedVersion)
+
+        if add:
+            # check if user already added article otherwise add
+            if request.websafeArticleKey in author.favoriteArticles:
+                raise ConflictException(
+                    "The article is already in %s's favorites list" % author.displayName
+                    )
+            author.favoriteArticles.append(request.websafeArticleKey)
+        else:
+            # check if article is in favorites
+            if not request.websafeArticleKey in author.favoriteArticles:
+                raise endpoints.NotFoundException(
+                    "The article is not in %s's favorites list" % author.displayName
+                    )
+            author.favoriteArticles.remove(request.websafeArticleKey)
+
+        # write Author back to the datastore
+        author.version += 1
         author.put()
-        return BooleanMessage(data=True)
+        return author
 
 
     @endpoints.method(message_types.VoidMessage, ArticleForms,
@@ -648,9 +1636,7 @@ class AcaApi(remote.Service):
 
         # todo: merge into getUserId
         # try by authorID first
-        author = Author.query()\
-            .filter(Author.authorID==request.websafeAuthorKey)\
-            .get()\
+        author = self._getAuthorByID(request.websafeAuthorKey)\
             or self._checkKey(request.websafeAuthorKey, 'Author').get()
 
         # return set of ArticleForm objects per favorite article
@@ -666,9 +1652,7 @@ class AcaApi(remote.Service):
         cf = CommentForm()
 
         if not author:
-            author = Author.query()\
-                .filter(Author.authorID==comment.authorID)\
-                .get()
+            author = self._getAuthorByID(comment.authorID)
 
         if not article_key:
             article_key = comment.key.parent()
@@ -696,7 +1680,12 @@ class AcaApi(remote.Service):
         
         if not request.comment or not len(request.comment) > 8:
             raise endpoints.BadRequestException("Comment '%s' is too short" % request.comment)
-        # todo: clean comment
+
+
+    def _renderComment(self, comment):
+        """Store safe HTML of a Comment, so reads don't render"""
+        comment.commentHtml = render.renderComment(comment.comment)
+        comment.htmlVersion = render.HTML_VERSION
 
     @endpoints.method(COMMENT_POST_REQUEST, CommentForm,
             path='article/{websafeArticleKey}/comment',
@@ -705,36 +1694,165 @@ class AcaApi(remote.Service):
         """Create new Comment object, returning CommentForm/request."""
         
         author = self._getAuthorFromUser()
-        data['authorName'] = author.displayName
-        data['authorID'] = author.authorID
+        self._checkRateLimit('createComment', author)
 
         self._checkComment(request)
 
-        data = {'comment': request.comment}
-
         # get the article key for where the comment will be added
         article_key = self._checkKey(request.websafeArticleKey, 'Article')
 
-        comment_id = Comment.allocate_ids(size=1, parent=article_key)[0]
-        comment_key = ndb.Key(Comment, comment_id, parent=article_key)
-        data['key'] = comment_key
-
-        # create Comment
-        comment_key = Comment(**data).put()
+        # create Comment; the put assigns its ID and dateCreated
+        comment = Comment(parent=article_key,
+            comment=request.comment,
+            authorName=author.displayName,
+            authorID=author.authorID,
+        )
+        self._renderComment(comment)
+        self._putComment(comment, author).get_result()
+        self._bufferCount(MEMCACHE_COMMENTS_BUFFER, article_key)
+
+        return self._copyCommentToForm(comment, article_key=article_key, author=author)
+
+
+    @ndb.transactional_tasklet
+    def _putComment(self, comment, author):
+        """Put a new Comment on a published Article, subscribe its author to the
+            Article and queue an alert"""
+        article_key = comment.key.parent()
+        subscribers_key = ndb.Key(ArticleSubscribers, 'subscribers', parent=article_key)
+        article, subscribers = yield article_key.get_async(), subscribers_key.get_async()
+        # checked in the transaction, so a retraction or delete can't come in between
+        if not article or article.view != 'PUBLISHED':
+            raise endpoints.NotFoundException(
+                'No published Article found with key: %s' % article_key.urlsafe())
+        comment_key = yield comment.put_async()
+
+        subscribers = subscribers or ArticleSubscribers(key=subscribers_key)
+        futures = []
+        if author.mainEmail not in subscribers.emails:
+            subscribers.emails.append(author.mainEmail)
+            futures.append(subscribers.put_async())
+
+        # alert all authors of Article and all other comments; recipients
+        # are looked up when alerts are sent, so the event stays small
+        alert = taskqueue.Task(method='PULL', payload=json.dumps({
+            'article': article_key.urlsafe(),
+            'email': author.mainEmail,
+            'authorName': author.displayName,
+            'comment': comment.comment[:200],
+            }))
+        futures.append(alert.add_async(queue_name=COMMENT_ALERT_QUEUE, transactional=True))
+        yield futures
+        raise ndb.Return(comment_key)
+
+
+    def _flushCommentCounts(self):
+        """Add buffered comment counts to their Articles, one transaction per Author"""
+        counts = self._drainBuffer(MEMCACHE_COMMENTS_BUFFER)
+        by_author = {}
+        for wsak, count in counts.items():
+            article_key = ndb.Key(urlsafe=wsak)
+            by_author.setdefault(article_key.parent(), {})[article_key] = count
+
+        ndb.Future.wait_all([self._updateCommentCounts(author_key, article_counts, add=True)
+            for author_key, article_counts in by_author.items()])
+        if by_author:
+            entitycache.invalidate('Article')
+
+
+    @ndb.transactional_tasklet
+    def _updateCommentCounts(self, author_key, counts, add):
+        """Add counts (by Article key) to, or set them as, the comment counts of
+            an Author's Articles, in one transaction on the Author's entity group"""
+        articles = yield ndb.get_multi_async(counts.keys())
+        changed = []
+        for article in articles:
+            # comments of retracted and deleted articles are removed, so they count none
+            if not article or (add and article.view in ('RETRACTED', 'DELETED')):
+                continue
+            article.commentCount = (article.commentCount + counts[article.key] if add
+                else counts[article.key])
+            changed.append(article)
+        if changed:
+            yield ndb.put_multi_async(changed)
+
+
+    def _backfillCommentCounts(self, cursor=None):
+        """Count the comments of a batch of Articles, then chain the next batch"""
+        article_keys, cursor, more = Article.query().fetch_page(BACKFILL_BATCH, keys_only=True,
+            start_cursor=ndb.Cursor(urlsafe=cursor) if cursor else None)
+
+        # comments counted here must not be added again from the buffer
+        memcache.delete_multi([key.urlsafe() for key in article_keys],
+            key_prefix=MEMCACHE_COMMENTS_BUFFER + ':')
+        futures = [Comment.query(ancestor=key).count_async() for key in article_keys]
+        by_author = {}
+        for key, future in zip(article_keys, futures):
+            by_author.setdefault(key.parent(), {})[key] = future.get_result()
+
+        ndb.Future.wait_all([self._updateCommentCounts(author_key, counts, add=False)
+            for author_key, counts in by_author.items()])
+        entitycache.invalidate('Article')
+
+        if more and cursor:
+            taskqueue.add(params={'cursor': cursor.urlsafe()},
+                url='/tasks/backfill_comment_counts'
+            )
 
-        # send alerts to all authors of Article and all other comments
-        #taskqueue.add(params={'email': author.mainEmail,
-        #    'CommentInfo': repr(request)},
-        #    url='/tasks/send_comment_alert'
-        #)
 
-        return self._copyCommentToForm(comment_key.get(), article_key=article_key, author=author)
+    def _sendCommentAlerts(self):
+        """Lease queued comment alerts and mail one digest per recipient"""
+        queue = taskqueue.Queue(COMMENT_ALERT_QUEUE)
+        for attempt in range(COMMENT_ALERT_ROUNDS):
+            tasks = queue.lease_tasks(COMMENT_ALERT_LEASE, COMMENT_ALERT_BATCH)
+            if not tasks:
+                break
+
+            alerts = [json.loads(task.payload) for task in tasks]
+            article_keys = list(set(ndb.Key(urlsafe=alert['article']) for alert in alerts))
+            subscriber_keys = [ndb.Key(ArticleSubscribers, 'subscribers', parent=article_key)
+                for article_key in article_keys]
+            entities = ndb.get_multi(article_keys + subscriber_keys +
+                [article_key.parent() for article_key in article_keys])
+            count = len(article_keys)
+            articles = dict(zip(article_keys, entities[:count]))
+            subscribers = dict(zip(article_keys, entities[count:2 * count]))
+            authors = dict(zip(article_keys, entities[2 * count:]))
+
+            # coalesce alerts per recipient, skipping their own comments
+            digests = {}
+            for alert in alerts:
+                article_key = ndb.Key(urlsafe=alert['article'])
+                article = articles[article_key]
+                if not article:
+                    continue
+                recipients = set(subscribers[article_key].emails if subscribers[article_key] else [])
+                if authors[article_key]:
+                    recipients.add(authors[article_key].mainEmail)
+                recipients.discard(alert['email'])
+                for recipient in recipients:
+                    digests.setdefault(recipient, []).append(
+                        '%s commented on "%s":\r\n%s' % (
+                            alert['authorName'], article.title, alert['comment']))
+
+            sender = 'noreply@%s.appspotmail.com' % app_identity.get_application_id()
+            for recipient, lines in digests.items():
+                # one bad address mustn't resend the digests of the others
+                try:
+                    mail.send_mail(sender, recipient,
+                        'New comments on the Art Crime Archive',
+                        '\r\n\r\n'.join(lines))
+                except Exception:
+                    logging.exception('Comment alerts to %s not sent', recipient)
+
+            queue.delete_tasks(tasks)
+            if len(tasks) < COMMENT_ALERT_BATCH:
+                break
 
 
     @endpoints.method(COMMENT_UPDATE_REQUEST, CommentForm,
             path='comment/{websafeCommentKey}',
             http_method='PUT', name='updateMyComment')
-    @ndb.transactional(xg=True)
     def updateMyComment(self, request):
         """Update Comment object, returning CommentForm/request."""
 
@@ -742,18 +1860,32 @@ class AcaApi(remote.Service):
 
         self._checkComment(request)
 
-        # get existing Comment
-        comment = self._checkKey(request.websafeCommentKey, 'Comment').get()
-        comment.comment = request.comment
+        comment_key = self._checkKey(request.websafeCommentKey, 'Comment')
+        comment = self._updateComment(comment_key, author, request)
+
+        return self._copyCommentToForm(comment, author=author)
+
+
+    @ndb.transactional()
+    def _updateComment(self, comment_key, author, request):
+        """Compare-and-set update of a Comment, inside its own entity group only"""
+        comment = comment_key.get()
+        if not comment:
+            raise endpoints.NotFoundException(
+                'No Comment found with key: %s' % request.websafeCommentKey)
 
         # check that user is owner
         if author.authorID != comment.authorID:
             raise endpoints.ForbiddenException(
-                'Only the comment author, %s, can update this Comment.' % author.authorName
+                'Only the comment author, %s, can update this Comment.' % comment.authorName
                 )
-        comment.put()
+        self._checkVersion(comment, request.expectedVersion)
 
-        return self._copyCommentToForm(comment, author=author)
+        comment.comment = request.comment
+        self._renderComment(comment)
+        comment.version += 1
+        comment.put()
+        return comment
 
 
     @endpoints.method(COMMENT_GET_REQUEST, CommentForms,
@@ -799,6 +1931,415 @@ class AcaApi(remote.Service):
         )
 
 
+# - - - Response cache - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def _cacheKey(self, name, args):
+        """Return memcache key suffix for a cached response and its args"""
+        return ':'.join([name] + [str(arg) for arg in args])
+
+
+    def _cachedResponse(self, name, *args):
+        """Return a cached response message, building it at most once at a time.
+
+        A memcache add() lease lets only one request rebuild an entry; the
+        others keep serving the previous value. Entries past their soft TTL
+        are served stale while a task refreshes them in the background.
+        """
+        message_type, builder, soft_ttl = CACHED_RESPONSES[name]
+        key = self._cacheKey(name, args)
+
+        for attempt in range(CACHE_LEASE_RETRIES):
+            entry = memcache.get(MEMCACHE_CACHE_PREFIX + key)
+            data = entry and self._loadCache(entry)
+            if data:
+                if entry['expires'] < time.time() and \
+                        memcache.add(MEMCACHE_LEASE_PREFIX + key, 1, time=CACHE_LEASE_TTL):
+                    try:
+                        taskqueue.add(params={'name': name, 'args': json.dumps(args)},
+                            url='/tasks/refresh_cache'
+                        )
+                    except taskqueue.Error:
+                        memcache.delete(MEMCACHE_LEASE_PREFIX + key)
+                with tracing.Span('decode cached %s' % name):
+                    return protojson.decode_message(message_type, data)
+
+            # nothing cached yet: rebuild if we win the lease, else wait for the winner
+            if memcache.add(MEMCACHE_LEASE_PREFIX + key, 1, time=CACHE_LEASE_TTL):
+                return self._refreshCache(name, *args)
+            time.sleep(CACHE_LEASE_WAIT)
+
+        # lease holder is slow or gone, don't keep the user waiting
+        return getattr(self, builder)(*args)
+
+
+    def _refreshCache(self, name, *args):
+        """Rebuild a cached response, store it and release its lease"""
+        message_type, builder, soft_ttl = CACHED_RESPONSES[name]
+        key = self._cacheKey(name, args)
+
+        try:
+            # the response outlives this instance's entity cache check interval,
+            # so build it from entities current as of the invalidation that got here
+            entitycache.refresh()
+            with tracing.Span('build %s' % name):
+                response = getattr(self, builder)(*args)
+            with tracing.Span('encode %s' % name):
+                data = protojson.encode_message(response)
+            with tracing.Span('store %s' % name):
+                if not self._storeCache(key, data, soft_ttl):
+                    logging.warning('Response %s of %d bytes not cached', key, len(data))
+        finally:
+            memcache.delete(MEMCACHE_LEASE_PREFIX + key)
+        return response
+
+
+    def _storeCache(self, key, data, soft_ttl):
+        """Store an encoded response compressed, split over values under memcache's
+            size limit when needed. Returns False if it isn't stored"""
+        data = zlib.compress(data)
+        chunks = [data[i:i + CACHE_CHUNK_BYTES] for i in range(0, len(data), CACHE_CHUNK_BYTES)]
+        if len(chunks) > CACHE_CHUNKS_MAX:
+            return False
+
+        entry = {'expires': time.time() + soft_ttl}
+        if len(chunks) == 1:
+            entry['zdata'] = chunks[0]
+        else:
+            # new chunk keys per store, so an entry never mixes chunks of two stores
+            chunk_key = '%s:%x' % (key, random.getrandbits(32))
+            entry['chunks'] = (chunk_key, len(chunks))
+            if memcache.set_multi(dict(('%s:%d' % (chunk_key, i), chunk)
+                    for i, chunk in enumerate(chunks)),
+                    key_prefix=MEMCACHE_CACHE_PREFIX, time=CACHE_HARD_TTL):
+                return False
+        return memcache.set(MEMCACHE_CACHE_PREFIX + key, entry, time=CACHE_HARD_TTL)
+
+
+    def _loadCache(self, entry):
+        """Return the encoded response of a cache entry, or None if a chunk was evicted"""
+        if 'chunks' in entry:
+            chunk_key, count = entry['chunks']
+            chunk_keys = ['%s:%d' % (chunk_key, i) for i in range(count)]
+            chunks = memcache.get_multi(chunk_keys, key_prefix=MEMCACHE_CACHE_PREFIX)
+            if len(chunks) < count:
+                return None
+            return zlib.decompress(''.join(chunks[name] for name in chunk_keys))
+        if 'zdata' in entry:
+            return zlib.decompress(entry['zdata'])
+        return None
+
+
+    def _invalidateCache(self, name, *args):
+        """Mark a cached response stale, keeping it to serve during the rebuild"""
+        key = MEMCACHE_CACHE_PREFIX + self._cacheKey(name, args)
+        entry = memcache.get(key)
+        if entry:
+            entry['expires'] = 0
+            memcache.set(key, entry, time=CACHE_HARD_TTL)
+
+
+# - - - Author pages - - - - - - - - - - - - - - - - - - - -
+
+    def _getAuthorPage(self, author, published_only):
+        """Return AuthorPageForm, running the article, favorite and comment reads concurrently"""
+        articles = Article.query(ancestor=author.key)
+        if published_only:
+            articles = articles.filter(Article.view=='PUBLISHED')
+        articles_future = articles.order(-Article.dateCreated).fetch_async(AUTHOR_PAGE_SIZE)
+
+        comments_future = Comment.query()\
+            .filter(Comment.authorID==author.authorID)\
+            .fetch_async(AUTHOR_PAGE_SIZE)
+
+        favorite_keys = [ndb.Key(urlsafe=wsak) for wsak in author.favoriteArticles[:AUTHOR_PAGE_SIZE]]
+        favorites_future = ndb.get_multi_async(favorite_keys)
+
+        # favorites may belong to anyone, so their Authors are fetched in one more batch
+        favorites = [f.get_result() for f in favorites_future]
+        favorites = [article for article in favorites if article]
+        authors = {author.key: author}
+        parent_keys = list(set(article.key.parent() for article in favorites) - set(authors))
+        for parent in ndb.get_multi(parent_keys):
+            if parent:
+                authors[parent.key] = parent
+
+        return AuthorPageForm(
+            author=self._copyAuthorToForm(author),
+            articles=[self._copyArticleToForm(article, author=author)
+                for article in articles_future.get_result() if article.view != 'DELETED'],
+            favorites=[self._copyArticleToForm(article, author=authors[article.key.parent()])
+                for article in favorites if article.key.parent() in authors],
+            comments=[self._copyCommentToForm(comment, author=author)
+                for comment in comments_future.get_result()],
+        )
+
+
+    @endpoints.method(message_types.VoidMessage, AuthorPageForm,
+            path='myDashboard',
+            http_method='GET', name='getMyDashboard')
+    def getMyDashboard(self, request):
+        """Return users author profile with their articles, favorites and comments"""
+        return self._getAuthorPage(self._getAuthorFromUser(), published_only=False)
+
+
+    @endpoints.method(ARTICLES_BY_AUTHOR, AuthorPageForm,
+            path='authorPage/{websafeAuthorKey}',
+            http_method='GET', name='getAuthorPage')
+    def getAuthorPage(self, request):
+        """Return author (key or authorID) with published articles, favorites and comments"""
+        author = self._getAuthorByID(request.websafeAuthorKey)\
+            or self._checkKey(request.websafeAuthorKey, 'Author').get()
+
+        if not author:
+            raise endpoints.NotFoundException(
+                'No author found with key: %s' % request.websafeAuthorKey)
+
+        return self._getAuthorPage(author, published_only=True)
+
+
+# - - - Legacy links - - - - - - - - - - - - - - - - - - - - - - -
+
+    @endpoints.method(LegacyIDForms, LegacyArticleForms,
+            path='legacyIDs/resolve',
+            http_method='POST', name='resolveLegacyIDs')
+    def resolveLegacyIDs(self, request):
+        """Return the Articles of legacy ACA article IDs, in request order"""
+        if len(request.legacyIDs) > LEGACY_IDS_MAX:
+            raise endpoints.BadRequestException(
+                'At most %d legacy IDs can be resolved at once' % LEGACY_IDS_MAX)
+
+        items = []
+        for legacyID, legacy_article in zip(request.legacyIDs,
+                self._resolveLegacyIDs(request.legacyIDs)):
+            if legacy_article:
+                items.append(LegacyArticleForm(legacyID=legacyID,
+                    websafeArticleKey=legacy_article.article.urlsafe(),
+                    authorID=legacy_article.authorID,
+                    articleID=str(legacy_article.article.id())))
+            else:
+                items.append(LegacyArticleForm(legacyID=legacyID,
+                    error='No Article found for legacy ID %s' % legacyID))
+        return LegacyArticleForms(items=items)
+
+
+    def _resolveLegacyIDs(self, legacyIDs):
+        """Return the LegacyArticle of each legacyID, or None, also when its Article
+            is deleted; one batch get of each"""
+        keys = [ndb.Key(LegacyArticle, legacyID) if legacyID else None for legacyID in legacyIDs]
+        found = dict(zip(filter(None, keys), ndb.get_multi(filter(None, keys))))
+        article_keys = list(set(legacy_article.article
+            for legacy_article in found.values() if legacy_article))
+        deleted = set(article_key for article_key, article
+            in zip(article_keys, entitycache.get_multi(article_keys))
+            if not article or article.view == 'DELETED')
+        for key, legacy_article in found.items():
+            if legacy_article and legacy_article.article in deleted:
+                found[key] = None
+        return [found.get(key) if key else None for key in keys]
+
+
+    def _backfillLegacyIDs(self, cursor=None):
+        """Store LegacyArticles for a batch of imported Articles, then chain the next batch"""
+        articles, cursor, more = Article.query(Article.legacyID > '')\
+            .fetch_page(BACKFILL_BATCH, projection=[Article.legacyID],
+                start_cursor=ndb.Cursor(urlsafe=cursor) if cursor else None)
+
+        authors = dict((author.key, author) for author in
+            entitycache.get_multi(list(set(article.key.parent() for article in articles))) if author)
+        ndb.put_multi([LegacyArticle(id=article.legacyID, article=article.key,
+            authorID=authors[article.key.parent()].authorID)
+            for article in articles if article.key.parent() in authors])
+
+        if more and cursor:
+            taskqueue.add(params={'cursor': cursor.urlsafe()},
+                url='/tasks/backfill_legacy_ids'
+            )
+
+
+# - - - Bulk administration - - - - - - - - - - - - - - - - - - - -
+
+    @endpoints.method(BulkOperationForms, BulkResultForms,
+            path='admin/bulk',
+            http_method='POST', name='bulkUpdate')
+    def bulkUpdate(self, request):
+        """Apply a list of rights, featured, tag and view changes, if user is ADMINISTRATOR.
+            Returns a result per operation, in order"""
+        user_author = self._getAuthorFromUser()
+        if getattr(UserRights, user_author.userRights) < UserRights.ADMINISTRATOR:
+            raise endpoints.ForbiddenException(
+                "Only an administrator can make bulk changes."
+                )
+        if len(request.items) > BULK_OPERATIONS_MAX:
+            raise endpoints.BadRequestException(
+                'At most %d operations per request' % BULK_OPERATIONS_MAX)
+
+        # featured changes of checked Articles, as (item, result), applied at the end
+        featured = []
+        results = [BulkResultForm(websafeKey=item.websafeKey) for item in request.items]
+        for start in range(0, len(request.items), BULK_BATCH):
+            self._applyBulkOperations(request.items[start:start + BULK_BATCH],
+                results[start:start + BULK_BATCH], featured)
+
+        featured_key = featured and self._getAuthorKeyByID('0')
+        if featured_key and ndb.transaction(
+                lambda: self._applyFeaturedOperations(featured_key, featured)):
+            entitycache.invalidate('Author')
+        self._invalidateCache('allArticles')
+        self._invalidateCache('featuredArticles')
+        return BulkResultForms(items=results)
+
+
+    def _applyBulkOperations(self, items, results, featured):
+        """Apply a batch of bulk operations in one transaction per Author,
+            then update what derives from the changed Articles"""
+        keys = []
+        for item, result in zip(items, results):
+            kind = 'Author' if item.operation == BulkOperation.SET_RIGHTS else 'Article'
+            try:
+                keys.append(self._checkKey(item.websafeKey, kind))
+            except endpoints.NotFoundException as e:
+                keys.append(None)
+                result.error = e.message
+
+        # Articles are in their Author's entity group, so each Author's entities are
+        # read, changed and put in one transaction with its published count
+        groups = {}
+        for key, item, result in zip(keys, items, results):
+            if key:
+                groups.setdefault(key.parent() or key, []).append((key, item, result))
+        previous = {}
+        changed = {}
+        for author_key, operations in groups.items():
+            group_previous, group_changed, group_featured = ndb.transaction(
+                lambda: self._applyAuthorGroup(author_key, operations))
+            previous.update(group_previous)
+            changed.update(group_changed)
+            featured.extend(group_featured)
+        for kind in set(key.kind() for key in changed):
+            entitycache.invalidate(kind)
+
+        deltas = {}
+        for key, article in changed.items():
+            if key.kind() != 'Article':
+                continue
+            old = previous[key]
+            for month, delta in ((old['publishedMonth'], -1), (article.publishedMonth, 1)):
+                if month:
+                    deltas[month] = deltas.get(month, 0) + delta
+            was_published = old['view'] == 'PUBLISHED'
+            self._queueRelatedUpdate(article, old['tags'] if was_published else [])
+            if article.view == 'RETRACTED' and old['view'] != 'RETRACTED':
+                self._queueArticleCleanup(key)
+
+        # one archive calendar update for the batch
+        deltas = dict((month, delta) for month, delta in deltas.items() if delta)
+        if deltas:
+            self._updateArchiveCalendar(deltas)
+            memcache.delete(MEMCACHE_ARCHIVE_CALENDAR_KEY)
+
+
+    def _applyAuthorGroup(self, author_key, operations):
+        """Apply (key, item, result) bulk operations to entities of an Author's entity
+            group and adjust its published count; call in a transaction. Returns the
+            previous values and the changed entities by key, and the (item, result)
+            featured operations of existing Articles"""
+        unique_keys = list(set(key for key, item, result in operations))
+        entities = dict(zip(unique_keys, ndb.get_multi(unique_keys)))
+
+        previous = {}
+        changed = {}
+        featured = []
+        for key, item, result in operations:
+            # set again when the transaction is retried
+            result.error = None
+            entity = entities[key]
+            if not entity or (key.kind() == 'Article' and entity.view == 'DELETED'):
+                result.error = 'No %s found with key: %s' % (key.kind(), item.websafeKey)
+                continue
+            if key not in previous:
+                previous[key] = entity.to_dict()
+
+            if item.operation in (BulkOperation.FEATURE, BulkOperation.UNFEATURE):
+                featured.append((item, result))
+                continue
+            result.error = self._applyBulkOperation(entity, item)
+            if not result.error:
+                changed[key] = entity
+
+        published = 0
+        for key, entity in changed.items():
+            entity.version += 1
+            if key.kind() == 'Article':
+                entity.dateModified = datetime.now()
+                was_published = previous[key]['view'] == 'PUBLISHED'
+                if was_published != (entity.view == 'PUBLISHED'):
+                    published += -1 if was_published else 1
+        ndb.put_multi(changed.values())
+        if published:
+            self._adjustPublishedCount(author_key, published).get_result()
+        return previous, changed, featured
+
+
+    def _applyBulkOperation(self, entity, item):
+        """Apply one bulk operation to entity.
+            Returns an error message if it can't be applied"""
+        operation = item.operation
+        if operation == BulkOperation.SET_RIGHTS:
+            if not item.userRights:
+                return 'userRights required'
+            entity.userRights = str(item.userRights)
+
+        elif operation == BulkOperation.SET_VIEW:
+            if not item.view:
+                return 'view required'
+            if item.view == View.DELETED:
+                return 'Use deleteMyArticle to delete an Article'
+            entity.view = str(item.view)
+
+        elif operation in (BulkOperation.ADD_TAG, BulkOperation.REMOVE_TAG):
+            if not item.tag:
+                return 'tag required'
+            if operation == BulkOperation.ADD_TAG:
+                if item.tag in entity.tags:
+                    return 'Article already has tag %s' % item.tag
+                entity.tags.append(item.tag)
+            else:
+                if item.tag not in entity.tags:
+                    return 'Article has no tag %s' % item.tag
+                entity.tags.remove(item.tag)
+
+        else:
+            return 'operation required'
+
+
+    def _applyFeaturedOperations(self, featured_key, operations):
+        """Apply (item, result) FEATURE and UNFEATURE operations to the featured
+            articles, read from the datastore; call in a transaction.
+            Returns True if they changed"""
+        favoritesAuthor = featured_key.get()
+        changed = False
+        for item, result in operations:
+            # set again when the transaction is retried
+            result.error = None
+            if item.operation == BulkOperation.FEATURE:
+                if item.websafeKey in favoritesAuthor.favoriteArticles:
+                    result.error = 'Article is already a featured article'
+                else:
+                    favoritesAuthor.favoriteArticles.append(item.websafeKey)
+                    changed = True
+            else:
+                if item.websafeKey not in favoritesAuthor.favoriteArticles:
+                    result.error = 'Article is not a featured article'
+                else:
+                    favoritesAuthor.favoriteArticles.remove(item.websafeKey)
+                    changed = True
+
+        if changed:
+            favoritesAuthor.version += 1
+            favoritesAuthor.put()
+        return changed
+
+
 # - - - Helper endpoints and methods - - - - - - - - - - - - - - - - - - - -
 
     def _getAuthorFromEmail(self, email):
@@ -818,79 +2359,6 @@ class AcaApi(remote.Service):
 
         return author
 
-    def copyArticlesKind(self, article, author):
-        """Create new Article and Comment objects from old Articles object, returning True if success."""
-        
-        article_id = Article.allocate_ids(size=1, parent=author.key)[0]
-        article_key = ndb.Key(Article, article_id, parent=author.key)
-        a = article_key.get()
-        if a:
-            return
-
-        # copy ArticleForm/ProtoRPC Message into dict
-        data = db.to_dict(article)
-        data['key'] = article_key
-
-        if 'comments' in data:
-            for comment in data['comments']:
-                #Create new Comment object
-                comment_author_email = str(loads(str(comment))[1])
-                a_key = ndb.Key(Author, comment_author_email or 'unknown')
-                comment_author = a_key.get()
-                # create new Author if not there
-                if not comment_author:
-                    comment_author = Author(
-                        key = a_key,
-                        authorID = str(Author.allocate_ids(size=1)[0]),
-                        displayName = comment_author_email.split('@')[0],
-                        mainEmail = comment_author_email,
-                    )
-                    comment_author.put()
-
-                comment_data = {
-                    'comment': loads(str(comment))[0],
-                    'authorName': comment_author.displayName if comment_author else 'unknown',
-                    'authorID': comment_author.authorID if comment_author else 'unknown',
-                    'dateCreated': loads(str(comment))[2]
-                }
-
-                comment_id = Comment.allocate_ids(size=1, parent=article_key)[0]
-                comment_key = ndb.Key(Comment, comment_id, parent=article_key)
-                comment_data['key'] = comment_key
-
-                # create Comment
-                Comment(**comment_data).put()
-
-            del data['comments']
-
-        if 'tags' in data:
-            #del data['tags']
-            try:
-                data['tags'] = str(data['tags']).split(', ')
-            except UnicodeEncodeError:
-                del data['tags']
-        if 'tags' in data and data['tags'] == [""]:
-            del data['tags']
-
-        if 'id' in data:
-            del data['id']
-
-        if data['view'] == None:
-            del data['view']
-        else:
-            data['view'] = {'Publish': 'PUBLISHED', 'Preview': 'NOT_PUBLISHED', 'Retract': 'RETRACTED'}[str(data['view'])]
-
-        data['legacyID'] = str(article.key().id())
-
-        data['authorName'] = author.displayName
-        del data['author']
-        data['dateCreated'] = data['date']
-        del data['date']
-
-        # create Article
-        Article(**data).put()
-
-
     @endpoints.method(message_types.VoidMessage, BooleanMessage,
             path='copyFromArticles',
             http_method='GET', name='copyFromArticles')
@@ -899,27 +2367,15 @@ class AcaApi(remote.Service):
         user = endpoints.get_current_user()
         if not user:
             raise endpoints.UnauthorizedException('Authorization required')
+        self._checkRateLimit('copyFromArticles', self._getAuthorFromUser())
 
-        for article in Articles().all():
-            if '@' not in article.author:
-                author_email = article.author + '@gmail.com'
-            else:
-                author_email = article.author
-
-            a_key = ndb.Key(Author, author_email)
-            author = a_key.get()
-            # create new Author if not there
-            if not author:
-                author = Author(
-                    key = a_key,
-                    authorID = str(Author.allocate_ids(size=1)[0]),
-                    displayName = author_email.split('@')[0],
-                    mainEmail = author_email,
-                )
-                author.put()
-            
-            self.copyArticlesKind(article, author)
+        import migration
+        migration.copyFromArticles()
+        memcache.delete(MEMCACHE_SUGGEST_KEY)
 
+        # rebuild the archive calendar over the imported articles
+        taskqueue.add(url='/tasks/backfill_articles')
+        self._invalidateCache('allArticles')
         return BooleanMessage(data=True)
 
     @endpoints.method(message_types.VoidMessage, BooleanMessage,
@@ -931,21 +2387,11 @@ class AcaApi(remote.Service):
         if not user:
             raise endpoints.UnauthorizedException('Authorization required')
 
-        favoritesAuthor = Author.query(Author.authorID=='0').get()
-
-        featured_ids = [11006, 97006, 98006, 91006, 91004, 95001, 46003, 87006, 85006, 59001,
-           49001, 9001, 10001, 23008, 31006, 4001, 13001, 21012, 35008, 21005,
-           27001, 18002, 5001, 7001, 25001, 12002, 28011, 8002, 22002]
-
-        for legacyID in featured_ids:
-            article = Article.query(Article.legacyID==str(legacyID)).get()
-            if article:
-                websafeArticleKey = article.key.urlsafe()
-
-                if websafeArticleKey not in favoritesAuthor.favoriteArticles:
-                    favoritesAuthor.favoriteArticles.append(websafeArticleKey)
-                    favoritesAuthor.put()
+        import migration
+        migration.setFeaturedArticles(self._getAuthorKeyByID('0'))
 
+        entitycache.invalidate('Author')
+        self._invalidateCache('featuredArticles')
         return BooleanMessage(data=True)
 
     @endpoints.method(message_types.VoidMessage, ArticleForms,
@@ -967,6 +2413,108 @@ class AcaApi(remote.Service):
             items=[self._copyArticleToForm(conf, "") for article in q]
         )
 
+    def _checkArticle(self, article, websafeArticleKey):
+        '''Check that article exists and isn't deleted, returning it'''
+        if not article or article.view == 'DELETED':
+            raise endpoints.NotFoundException(
+                'No Article found with key: %s' % websafeArticleKey)
+        return article
+
+    def _queueArticleCleanup(self, article_key):
+        '''Queue removal of a retracted or deleted Article's comments and references'''
+        taskqueue.add(params={'websafeArticleKey': article_key.urlsafe(), 'phase': 'comments'},
+            url='/tasks/cleanup_article'
+        )
+
+    def _cleanupArticle(self, websafeArticleKey, phase, cursor=None):
+        '''Delete a batch of a retracted or deleted Article's descendants, or drop it
+            from a batch of favorites lists, then chain the next batch'''
+        article_key = ndb.Key(urlsafe=websafeArticleKey)
+        start_cursor = ndb.Cursor(urlsafe=cursor) if cursor else None
+
+        # the article may have been published again since the cleanup was queued
+        if not self._isRemoved(article_key.get()):
+            return
+
+        if phase == 'comments':
+            # comments and the other entities kept under the Article
+            keys, cursor, more = ndb.Query(ancestor=article_key)\
+                .fetch_page(CLEANUP_BATCH, keys_only=True, start_cursor=start_cursor)
+            ndb.delete_multi([key for key in keys if key != article_key])
+            if not (more and cursor):
+                memcache.delete(MEMCACHE_COMMENTS_BUFFER + ':' + websafeArticleKey)
+                self._updateCommentCounts(article_key.parent(), {article_key: 0}, add=False).get_result()
+                entitycache.invalidate('Article')
+        else:
+            # favorites of every Author, including the featured list of authorID 0
+            author_keys, cursor, more = Author.query(Author.favoriteArticles==websafeArticleKey)\
+                .fetch_page(CLEANUP_BATCH, keys_only=True, start_cursor=start_cursor)
+            for author_key in author_keys:
+                ndb.transaction(lambda: self._dropFavorite(author_key, article_key), xg=True)
+            if author_keys:
+                entitycache.invalidate('Author')
+
+        if not (more and cursor):
+            if phase == 'favorites':
+                self._invalidateCache('featuredArticles')
+                self._invalidateCache('trendingArticles')
+                return
+            phase, cursor = 'favorites', None
+
+        taskqueue.add(params={'websafeArticleKey': websafeArticleKey, 'phase': phase,
+            'cursor': cursor.urlsafe() if cursor else ''},
+            url='/tasks/cleanup_article'
+        )
+
+    def _dropFavorite(self, author_key, article_key):
+        '''Remove a retracted or deleted article from an Author's favorites; call
+            in a cross-group transaction, so a republished article stays'''
+        websafeArticleKey = article_key.urlsafe()
+        author, article = ndb.get_multi([author_key, article_key])
+        if not self._isRemoved(article):
+            return
+        if author and websafeArticleKey in author.favoriteArticles:
+            author.favoriteArticles.remove(websafeArticleKey)
+            author.version += 1
+            author.put()
+
+    def _isRemoved(self, article):
+        '''Return True if article is gone, retracted or deleted'''
+        return not article or article.view in ('RETRACTED', 'DELETED')
+
+    def _checkVersion(self, entity, expectedVersion):
+        '''Check that entity wasn't changed since the client read expectedVersion'''
+        if expectedVersion is not None and expectedVersion != entity.version:
+            raise ConflictException(
+                '%s was modified by someone else (version %d, expected %d)' % (
+                    entity.key.kind(), entity.version, expectedVersion))
+
+    def _checkRateLimit(self, name, author=None):
+        '''Raise TooManyRequestsException if the author, or the caller's IP address
+            when there is no author, made too many requests to endpoint name'''
+        factor = RATE_LIMIT_RIGHTS.get(author.userRights if author else 'NONE', 1)
+        if factor is None:
+            return
+        requests, seconds = RATE_LIMITS[name]
+        caller = author.key.id() if author else self.request_state.remote_address
+        key = '%s:%s:%d' % (name, caller, int(time.time() // seconds))
+
+        # callers already over the limit are turned away without a memcache call
+        count = RATE_COUNTS.get(key, 0)
+        if count <= requests * factor:
+            count = memcache.incr(MEMCACHE_RATE_PREFIX + key, initial_value=0)
+            if count is None:
+                # memcache is unavailable, let the request through
+                return
+            if len(RATE_COUNTS) >= RATE_COUNTS_MAX:
+                RATE_COUNTS.clear()
+            RATE_COUNTS[key] = count
+
+        if count > requests * factor:
+            raise TooManyRequestsException(
+                'Too many %s requests, try again in %d seconds' % (
+                    name, seconds - int(time.time()) % seconds))
+
     def _ndbKey(self, *args, **kwargs):
         # this try except clause is needed for NDB issue 143 
         # https://code.google.com/p/appengine-ndb-experiment/issues/detail?id=143
@@ -998,14 +2546,96 @@ class AcaApi(remote.Service):
 
         return key
 
+    def _warmup(self):
+        """Fill the caches a first request would otherwise pay for"""
+        self._getAuthorByID('0')
+        self._cachedResponse('featuredArticles')
+        self._cachedResponse('allArticles')
+
     # - - - Featured Author get handler - - - - - - - - - - - - - - - - - - - -
     @endpoints.method(message_types.VoidMessage, StringMessage,
             path='featuredAuthor',
             http_method='GET', name='getFeaturedAuthor')
     def getFeaturedAuthor(self, request):
         """Return Feature Author announcement from memcache."""
-        return StringMessage(data=memcache.get(MEMCACHE_FEATURED_AUTHOR_KEY) or "")
+        announcement = memcache.get(MEMCACHE_FEATURED_AUTHOR_KEY)
+        if announcement is None:
+            featured = ndb.Key(FeaturedAuthor, 'featured').get()
+            announcement = featured.announcement if featured else ""
+            memcache.set(MEMCACHE_FEATURED_AUTHOR_KEY, announcement)
+        return StringMessage(data=announcement)
+
+
+    @ndb.tasklet
+    def _adjustPublishedCount(self, author_key, delta):
+        """Add delta to an Author's published Article count; must run in a
+            transaction on the Author's entity group. Queues the featured
+            author check when the count goes up, or drops below two"""
+        counter_key = ndb.Key(AuthorCounter, 'counter', parent=author_key)
+        counter = yield counter_key.get_async()
+        if not counter:
+            # first change for this Author; the transaction snapshot excludes it
+            published = yield Article.query(ancestor=author_key)\
+                .filter(Article.view=='PUBLISHED')\
+                .count_async()
+            counter = AuthorCounter(key=counter_key, published=published)
+
+        counter.published = max(counter.published + delta, 0)
+        futures = [counter.put_async()]
+        if (delta > 0 and counter.published > 1) or (delta < 0 and counter.published < 2):
+            futures.append(taskqueue.Task(params={'websafeAuthorKey': author_key.urlsafe()},
+                url='/tasks/check_featuredAuthor'
+                ).add_async(transactional=True))
+        yield futures
+        raise ndb.Return(counter)
+
+
+    def _checkFeaturedAuthor(self, websafeAuthorKey):
+        """Make an Author with more than one published Article the featured author,
+            or clear the featured author once it has fewer"""
+        author_key = ndb.Key(urlsafe=websafeAuthorKey)
+        author, counter = ndb.get_multi([author_key,
+            ndb.Key(AuthorCounter, 'counter', parent=author_key)])
+        if not author or not counter or counter.published < 2:
+            if ndb.transaction(lambda: self._clearFeaturedAuthor(author_key)):
+                memcache.set(MEMCACHE_FEATURED_AUTHOR_KEY, "")
+            return
+
+        announcement = '%s is our latest Featured Author' % author.displayName
+        FeaturedAuthor(id='featured', author=author_key, announcement=announcement).put()
+        memcache.set(MEMCACHE_FEATURED_AUTHOR_KEY, announcement)
+
+
+    def _clearFeaturedAuthor(self, author_key):
+        """Delete the featured author if it is author_key's Author; call in a
+            transaction, so another Author featured meanwhile stays. Returns True if deleted"""
+        featured_key = ndb.Key(FeaturedAuthor, 'featured')
+        featured = featured_key.get()
+        if not featured or featured.author != author_key:
+            return False
+        featured_key.delete()
+        return True
 
 
+    @endpoints.method(message_types.VoidMessage, TraceForms,
+            path='slowTraces',
+            http_method='GET', name='getSlowTraces')
+    def getSlowTraces(self, request):
+        """Return the slowest traced requests per endpoint on this instance, if user is ADMINISTRATOR"""
+        user_author = self._getAuthorFromUser()
+        if getattr(UserRights, user_author.userRights) < UserRights.ADMINISTRATOR:
+            raise endpoints.ForbiddenException(
+                "Only an administrator can view request traces.")
+
+        return TraceForms(items=[TraceForm(
+            endpoint=trace['endpoint'],
+            date=str(trace['date']),
+            durationMs=trace['duration'] * 1000,
+            events=[TraceEventForm(name=name, startMs=(start - trace['start']) * 1000,
+                durationMs=duration * 1000) for name, start, duration in trace['events']],
+            ) for trace in tracing.slowTraces()]
+        )
+
 
-api = endpoints.api_server([AcaApi]) # register API
+# trace a sample of requests, see tracing.py
+api = tracing.TraceMiddleware(endpoints.api_server([AcaApi])) # register API
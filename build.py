@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+"""
+build.py -- bundles the web client for deployment
+
+    Concatenates (and minifies, when rjsmin is installed) the JavaScript
+    and CSS listed between the build markers in templates/index.html,
+    inlines the Angular partials into the $templateCache, writes the
+    bundles to static/dist under content hashed names and points
+    templates/index.html at them. app.yaml serves /dist with far-future
+    expiry, as a bundle's name changes whenever its content does.
+
+    usage: python build.py          build bundles and rewrite index.html
+           python build.py --clean  point index.html back at the sources
+"""
+
+__author__ = 'dan@salmonsen.org (Dan Salmonsen)'
+
+import glob
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+INDEX = os.path.join(ROOT, 'templates', 'index.html')
+DIST = os.path.join(ROOT, 'static', 'dist')
+PARTIALS = os.path.join(ROOT, 'static', 'partials', '*.html')
+
+# URL prefix: source directory, as mapped by app.yaml
+STATIC_DIRS = {
+    '/js/': 'static/js/',
+    '/css/': 'static/bootstrap/css/',
+}
+
+# <!-- build:js /js/a.js /js/b.js --> ... <!-- endbuild -->
+BUILD_BLOCK = re.compile(r'([ \t]*)<!-- build:(js|css) ([^>]*?) -->.*?<!-- endbuild -->', re.S)
+
+TAGS = {
+    'js': '<script src="%s"></script>',
+    'css': '<link rel="stylesheet" href="%s">',
+}
+
+
+def read(path):
+    with io.open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def sourcePath(url):
+    """Return file path of a static url"""
+    for prefix, directory in STATIC_DIRS.items():
+        if url.startswith(prefix):
+            return os.path.join(ROOT, directory, url[len(prefix):])
+    raise ValueError('No static directory for %s' % url)
+
+
+def templateCache():
+    """Return JavaScript putting every partial into the Angular $templateCache"""
+    puts = ['    $templateCache.put(%s, %s);' % (
+        json.dumps('/partials/' + os.path.basename(path)), json.dumps(read(path)))
+        for path in sorted(glob.glob(PARTIALS))]
+    return ("angular.module('acaApp').run(['$templateCache', function ($templateCache) {\n"
+        + '\n'.join(puts) + '\n}]);\n')
+
+
+def bundle(kind, urls):
+    """Write the bundle of urls and return its url"""
+    content = '\n'.join(read(sourcePath(url)) for url in urls)
+    if kind == 'js':
+        content += '\n' + templateCache()
+        if rjsmin:
+            content = rjsmin.jsmin(content)
+
+    data = content.encode('utf-8')
+    name = 'app.%s.%s' % (hashlib.md5(data).hexdigest()[:12], kind)
+    with open(os.path.join(DIST, name), 'wb') as f:
+        f.write(data)
+    return '/dist/' + name
+
+
+def build(clean=False):
+    if not clean:
+        for old in glob.glob(os.path.join(DIST, 'app.*')):
+            os.remove(old)
+        if not os.path.isdir(DIST):
+            os.makedirs(DIST)
+
+    def replace(match):
+        indent, kind, urls = match.group(1), match.group(2), match.group(3).split()
+        refs = urls if clean else [bundle(kind, urls)]
+        lines = ['<!-- build:%s %s -->' % (kind, ' '.join(urls))] + \
+            [TAGS[kind] % ref for ref in refs] + ['<!-- endbuild -->']
+        return '\n'.join(indent + line for line in lines)
+
+    html = BUILD_BLOCK.sub(replace, read(INDEX))
+    with io.open(INDEX, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+
+if __name__ == '__main__':
+    build(clean='--clean' in sys.argv[1:])
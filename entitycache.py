@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+"""
+entitycache.py -- process wide LRU cache of Authors and Articles;
+    each kind has a generation number in memcache, bumped by writes,
+    and entries cached under an older generation are ignored
+
+"""
+
+__author__ = 'dan@salmonsen.org (Dan Salmonsen)'
+
+import collections
+import threading
+import time
+
+from google.appengine.api import memcache
+from google.appengine.datastore import entity_pb
+from google.appengine.ext import ndb
+
+ENTITY_CACHE_BYTES = 16 * 1024 * 1024   # memory budget of encoded entities per instance
+ENTRY_OVERHEAD = 200                    # bytes counted per entry for its key and bookkeeping
+ENTRY_MAX_BYTES = 256 * 1024            # larger entities aren't cached
+GENERATION_CHECK_INTERVAL = 5           # seconds a generation is used before checking memcache
+MEMCACHE_GENERATION_PREFIX = "GENERATION:"
+CACHED_KINDS = ('Author', 'Article')
+
+# key: (generation, encoded entity, size), least recently used first; entities
+# are kept encoded so every caller gets its own copy, free to modify
+_entries = collections.OrderedDict()
+_size = [0]
+_lock = threading.Lock()
+
+# kind: (generation, time checked)
+_generations = {}
+
+_adapter = ndb.ModelAdapter()
+
+
+def _getGenerations(kinds):
+    """Return {kind: generation}, checking memcache for those not checked recently.
+        The generation is None, so nothing is cached, when memcache is unavailable"""
+    now = time.time()
+    stale = [kind for kind in kinds
+        if now - _generations.get(kind, (None, 0))[1] > GENERATION_CHECK_INTERVAL]
+    if stale:
+        values = memcache.get_multi(stale, key_prefix=MEMCACHE_GENERATION_PREFIX)
+        missing = [kind for kind in stale if kind not in values]
+        if missing:
+            # evicted or never set; add_multi lets the first instance pick the value
+            memcache.add_multi(dict((kind, int(now * 1000)) for kind in missing),
+                key_prefix=MEMCACHE_GENERATION_PREFIX)
+            values.update(memcache.get_multi(missing, key_prefix=MEMCACHE_GENERATION_PREFIX))
+        for kind in stale:
+            _generations[kind] = (values.get(kind), now)
+    return dict((kind, _generations[kind][0]) for kind in kinds)
+
+
+def _store(key, generation, entity):
+    encoded = _adapter.entity_to_pb(entity).Encode()
+    size = len(encoded) + ENTRY_OVERHEAD
+    if size > ENTRY_MAX_BYTES:
+        return
+    with _lock:
+        old = _entries.pop(key, None)
+        if old:
+            _size[0] -= old[2]
+        _entries[key] = (generation, encoded, size)
+        _size[0] += size
+        while _size[0] > ENTITY_CACHE_BYTES:
+            oldest, entry = _entries.popitem(last=False)
+            _size[0] -= entry[2]
+
+
+def get_multi(keys):
+    """Return the entities of keys, or None for those that don't exist, like
+        ndb.get_multi; Authors and Articles come from this instance when cached.
+        Not for use in transactions"""
+    cached_keys = set(key for key in keys if key.kind() in CACHED_KINDS)
+    generations = _getGenerations(set(key.kind() for key in cached_keys))
+
+    encoded = {}
+    with _lock:
+        for key in cached_keys:
+            entry = _entries.get(key)
+            if entry and entry[0] is not None and entry[0] == generations[key.kind()]:
+                # move to the most recently used end
+                del _entries[key]
+                _entries[key] = entry
+                encoded[key] = entry[1]
+
+    entities = dict((key, _adapter.pb_to_entity(entity_pb.EntityProto(value)))
+        for key, value in encoded.items())
+    missing = list(set(keys) - set(entities))
+    for key, entity in zip(missing, ndb.get_multi(missing)):
+        entities[key] = entity
+        if entity is not None and key in cached_keys and generations[key.kind()] is not None:
+            _store(key, generations[key.kind()], entity)
+    return [entities[key] for key in keys]
+
+
+def get(key):
+    """Return the entity of key, or None, like key.get(); see get_multi"""
+    return get_multi([key])[0]
+
+
+def refresh():
+    """Check the generations in memcache on the next get, so it sees every
+        invalidate made before; call before building what is cached elsewhere"""
+    for kind in list(_generations):
+        _generations[kind] = (_generations[kind][0], 0)
+
+
+def invalidate(kind):
+    """Call after writing entities of kind; this instance drops its cached
+        entities of kind at once, other instances within GENERATION_CHECK_INTERVAL"""
+    generation = memcache.incr(MEMCACHE_GENERATION_PREFIX + kind,
+        initial_value=int(time.time() * 1000))
+    _generations[kind] = (generation, time.time())
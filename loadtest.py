@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+
+"""
+loadtest.py -- concurrent load test of the aca API
+
+    Replays a mix of anonymous reads, authenticated writes, favorites
+    toggles and featured article changes (the authorID '0' entity)
+    against the dev server or a deployed version, at increasing
+    concurrency, and reports throughput, tail latency, transaction
+    retries and error rates per concurrency level.
+
+    With --trace-secret, the TRACE_SECRET of settings.py, requests carry
+    it in the X-Aca-Trace header, so tracing.py answers with the number
+    of datastore commits and failed (retried) commits of each request,
+    reported as failed/commits in the retries column.
+    Writes need --token, an OAuth2 access token of an Author; use an
+    ADMINISTRATOR to avoid the write rate limits, and a FELLOW or
+    ADMINISTRATOR for the featured operations.
+
+    usage: python loadtest.py [--url URL] [--token TOKEN] [--trace-secret SECRET]
+                              [--levels 1,2,4,8,16] [--duration 30]
+                              [--processes 1] [--mix read=80,write=5,favorite=10,feature=5]
+"""
+
+__author__ = 'dan@salmonsen.org (Dan Salmonsen)'
+
+import argparse
+import json
+import multiprocessing
+import random
+import threading
+import time
+
+try:
+    from urllib2 import Request, HTTPError, urlopen
+except ImportError:
+    from urllib.request import Request, urlopen
+    from urllib.error import HTTPError
+
+API_PATH = '/_ah/api/aca/v1/'
+DEFAULT_URL = 'http://localhost:8080'
+DEFAULT_MIX = 'read=80,write=5,favorite=10,feature=5'
+TRACE_HEADER = 'X-Aca-Trace'
+COMMITS_HEADER = 'X-Aca-Commits'
+READ_PATHS = ('articles', 'featuredArticles', 'trendingArticles', 'archiveCalendar')
+SUGGEST_PREFIXES = ('a', 'co', 'st', 'th', 'in')
+PERCENTILES = (50, 95, 99)
+
+
+class HTTPTransport(object):
+    """Requests to a running server"""
+    def __init__(self, url, token, trace_secret):
+        self.base = url.rstrip('/') + API_PATH
+        self.token = token
+        self.trace_secret = trace_secret
+
+    def request(self, method, path, body=None):
+        """Return (status, response dict, commits header)"""
+        headers = {'Content-Type': 'application/json'}
+        if self.trace_secret:
+            headers[TRACE_HEADER] = self.trace_secret
+        if self.token:
+            headers['Authorization'] = 'Bearer ' + self.token
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = Request(self.base + path, data=data, headers=headers)
+        req.get_method = lambda: method
+        try:
+            response = urlopen(req)
+        except HTTPError as e:
+            return e.code, {}, e.headers.get(COMMITS_HEADER)
+        content = response.read()
+        return response.getcode(), json.loads(content) if content else {}, \
+            response.headers.get(COMMITS_HEADER)
+
+
+class LoadTest(object):
+    """Mix of operations run by a thread at a time"""
+    def __init__(self, transport, mix, article_keys):
+        self.transport = transport
+        self.operations = [name for name, weight in mix for i in range(weight)]
+        self.article_keys = article_keys
+
+    def read(self):
+        choice = random.random()
+        if choice < 0.5 and self.article_keys:
+            return 'GET', 'article/%s' % random.choice(self.article_keys), None
+        if choice < 0.6:
+            return 'GET', 'suggest?prefix=%s' % random.choice(SUGGEST_PREFIXES), None
+        return 'GET', random.choice(READ_PATHS), None
+
+    def write(self):
+        if random.random() < 0.5 and self.article_keys:
+            return 'POST', 'article/%s/comment' % random.choice(self.article_keys), \
+                {'comment': 'Load test comment'}
+        return 'POST', 'article', {'title': 'Load test article',
+            'content': 'Load test article content', 'view': 'NOT_PUBLISHED'}
+
+    def favorite(self):
+        method = random.choice(('PUT', 'DELETE'))
+        return method, 'articles/favorites/%s' % random.choice(self.article_keys), None
+
+    def feature(self):
+        method = random.choice(('PUT', 'DELETE'))
+        return method, 'featuredArticles/%s' % random.choice(self.article_keys), None
+
+    def run(self, stop, samples):
+        """Make requests until stop, appending (operation, seconds, status, commits, failed)"""
+        while time.time() < stop:
+            operation = random.choice(self.operations)
+            method, path, body = getattr(self, operation)()
+            start = time.time()
+            try:
+                status, response, commits = self.transport.request(method, path, body)
+            except Exception:
+                status, commits = 0, None
+            commits, failed = (commits or '0/0').split('/')
+            samples.append((operation, time.time() - start, status, int(commits), int(failed)))
+
+
+def makeTransport(args):
+    return HTTPTransport(args.url, args.token, args.trace_secret)
+
+
+def runThreads(args, article_keys, threads, stop):
+    """Run threads LoadTest threads until stop; returns their samples"""
+    transport = makeTransport(args)
+    samples = []
+    workers = [threading.Thread(target=LoadTest(transport, args.mix, article_keys).run,
+        args=(stop, samples)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return samples
+
+
+def _runProcess(job):
+    return runThreads(*job)
+
+
+def runLevel(args, article_keys, concurrency):
+    """Run concurrency threads, spread over the processes, for args.duration"""
+    processes = min(args.processes, concurrency)
+    stop = time.time() + args.duration
+    if processes == 1:
+        return runThreads(args, article_keys, concurrency, stop)
+
+    threads = [concurrency // processes + (1 if i < concurrency % processes else 0)
+        for i in range(processes)]
+    pool = multiprocessing.Pool(processes)
+    try:
+        results = pool.map(_runProcess, [(args, article_keys, n, stop) for n in threads])
+    finally:
+        pool.close()
+    return [sample for samples in results for sample in samples]
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * p / 100.0))]
+
+
+def report(concurrency, samples, duration):
+    """Print the statistics of a concurrency level, overall and by operation"""
+    print('\nconcurrency %d: %d requests, %.1f requests/s' % (
+        concurrency, len(samples), len(samples) / float(duration)))
+    print('%-10s %8s %8s %8s %8s %8s %8s %8s %s' % ('operation', 'count', 'p50 ms',
+        'p95 ms', 'p99 ms', 'max ms', 'errors', 'retries', 'statuses'))
+
+    by_operation = {}
+    for sample in samples:
+        by_operation.setdefault(sample[0], []).append(sample)
+    for operation in sorted(by_operation) + ['all']:
+        rows = samples if operation == 'all' else by_operation[operation]
+        latencies = sorted(row[1] * 1000 for row in rows)
+        errors = len([row for row in rows if not 200 <= row[2] < 300])
+        commits = sum(row[3] for row in rows)
+        failed = sum(row[4] for row in rows)
+        statuses = {}
+        for row in rows:
+            statuses[row[2]] = statuses.get(row[2], 0) + 1
+        print('%-10s %8d %8.1f %8.1f %8.1f %8.1f %7.1f%% %8s %s' % ((operation, len(rows)) +
+            tuple(percentile(latencies, p) for p in PERCENTILES) + (latencies[-1],
+            100.0 * errors / len(rows), '%d/%d' % (failed, commits),
+            ' '.join('%s:%d' % item for item in sorted(statuses.items())))))
+
+
+def parseMix(mix, token):
+    """Return [(operation, weight)]; writes need a token"""
+    weights = []
+    for item in mix.split(','):
+        name, _, weight = item.partition('=')
+        if name not in ('read', 'write', 'favorite', 'feature'):
+            raise SystemExit('Unknown operation %s' % name)
+        if name != 'read' and not token:
+            continue
+        weights.append((name, int(weight)))
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent load test of the aca API')
+    parser.add_argument('--url', default=DEFAULT_URL)
+    parser.add_argument('--token', help='OAuth2 access token of an Author, for writes')
+    parser.add_argument('--trace-secret', help='TRACE_SECRET of settings.py, for retries')
+    parser.add_argument('--levels', default='1,2,4,8,16', help='concurrency levels')
+    parser.add_argument('--duration', type=int, default=30, help='seconds per level')
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='operation=weight list')
+    args = parser.parse_args()
+    args.mix = parseMix(args.mix, args.token)
+
+    status, response, commits = makeTransport(args).request('GET', 'articles')
+    article_keys = [item['websafeArticleKey'] for item in response.get('items', [])]
+    if not article_keys:
+        args.mix = [(name, weight) for name, weight in args.mix if name in ('read', 'write')]
+    print('%d articles, mix %s' % (len(article_keys),
+        ', '.join('%s=%d' % item for item in args.mix)))
+
+    for concurrency in [int(level) for level in args.levels.split(',')]:
+        report(concurrency, runLevel(args, article_keys, concurrency), args.duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,14 +7,14 @@ main.py --
 
 __author__ = 'dan@salmonsen.org (Dan Salmonsen)'
 
+import json
+
+import urllib
+
 import webapp2
 from google.appengine.api import app_identity
 from google.appengine.api import mail
-from aca import AcaApi, MEMCACHE_FEATURED_ARTICLE_KEY
-
-from google.appengine.api import memcache
-from google.appengine.ext import ndb
-from models import Article
+from aca import AcaApi
 
 class SetAnnouncementHandler(webapp2.RequestHandler):
     def get(self):
@@ -22,6 +22,30 @@ class SetAnnouncementHandler(webapp2.RequestHandler):
         AcaApi._cacheAnnouncement()
         self.response.set_status(204)
 
+class FlushViewsHandler(webapp2.RequestHandler):
+    def get(self):
+        """Flush buffered article views to counters and trending scores."""
+        AcaApi()._flushViews()
+        self.response.set_status(204)
+
+class FlushCommentCountsHandler(webapp2.RequestHandler):
+    def get(self):
+        """Add buffered comment counts to their articles."""
+        AcaApi()._flushCommentCounts()
+        self.response.set_status(204)
+
+class WarmupHandler(webapp2.RequestHandler):
+    def get(self):
+        """Load modules and fill caches before the instance serves users."""
+        AcaApi()._warmup()
+        self.response.set_status(200)
+
+class SendCommentAlertsHandler(webapp2.RequestHandler):
+    def get(self):
+        """Send batched comment alert digests from the pull queue."""
+        AcaApi()._sendCommentAlerts()
+        self.response.set_status(204)
+
 class SendConfirmationEmailHandler(webapp2.RequestHandler):
     def post(self):
         """Send email confirming Article creation."""
@@ -36,20 +60,120 @@ class SendConfirmationEmailHandler(webapp2.RequestHandler):
                 'articleInfo')
         )
 
+class RefreshCacheHandler(webapp2.RequestHandler):
+    def post(self):
+        """Rebuild a stale cached response in the background."""
+        AcaApi()._refreshCache(self.request.get('name'),
+            *json.loads(self.request.get('args') or '[]'))
+
+class RebuildSuggestHandler(webapp2.RequestHandler):
+    def post(self):
+        """Rebuild the suggest index missing from memcache."""
+        AcaApi()._rebuildSuggestIndex()
+
+class BackfillArticlesHandler(webapp2.RequestHandler):
+    def get(self):
+        """Start backfilling derived Article properties."""
+        AcaApi()._backfillArticles()
+        self.response.set_status(204)
+
+    def post(self):
+        """Backfill the next batch of Articles."""
+        AcaApi()._backfillArticles(self.request.get('cursor') or None,
+            json.loads(self.request.get('counts') or '{}'))
+
+class BackfillHtmlHandler(webapp2.RequestHandler):
+    def get(self):
+        """Start rendering HTML of Articles and Comments stored without it."""
+        AcaApi()._backfillHtml()
+        self.response.set_status(204)
+
+    def post(self):
+        """Render HTML of the next batch of Articles or Comments."""
+        AcaApi()._backfillHtml(int(self.request.get('kind')),
+            self.request.get('cursor') or None)
+
+class BackfillCommentCountsHandler(webapp2.RequestHandler):
+    def get(self):
+        """Start counting the comments of all Articles."""
+        AcaApi()._backfillCommentCounts()
+        self.response.set_status(204)
+
+    def post(self):
+        """Count the comments of the next batch of Articles."""
+        AcaApi()._backfillCommentCounts(self.request.get('cursor') or None)
+
+class BackfillLegacyIDsHandler(webapp2.RequestHandler):
+    def get(self):
+        """Start storing the legacy IDs of imported Articles."""
+        AcaApi()._backfillLegacyIDs()
+        self.response.set_status(204)
+
+    def post(self):
+        """Store the legacy IDs of the next batch of Articles."""
+        AcaApi()._backfillLegacyIDs(self.request.get('cursor') or None)
+
+# Old Art Crime Archive links are /article?id={legacyID}; a legacy ID always
+# resolves to the same Article, so the redirect can be cached at the edge.
+class LegacyArticleHandler(webapp2.RequestHandler):
+    def get(self):
+        """Redirect a legacy article link to the article's page."""
+        legacy_article = AcaApi()._resolveLegacyIDs([self.request.get('id')])[0]
+        if not legacy_article:
+            self.response.headers['Cache-Control'] = 'public, max-age=600'
+            return self.redirect('/')
+        self.response.headers['Cache-Control'] = 'public, max-age=86400'
+        self.redirect('/#/articles/detail/%s/%s' % (urllib.quote(legacy_article.authorID),
+            legacy_article.article.id()), permanent=True)
+
+class UpdateRelatedHandler(webapp2.RequestHandler):
+    def post(self):
+        """Update the tag index and related articles for an article."""
+        AcaApi()._updateRelatedArticles(self.request.get('websafeArticleKey'),
+            json.loads(self.request.get('oldTags') or '[]'))
+
+class CollectStatsHandler(webapp2.RequestHandler):
+    def get(self):
+        """Start the archive statistics job."""
+        AcaApi()._collectStats()
+        self.response.set_status(204)
+
+    def post(self):
+        """Count the next batch for the archive statistics."""
+        AcaApi()._collectStats(int(self.request.get('kind')),
+            self.request.get('cursor') or None, self.request.get('run'),
+            int(self.request.get('batch') or 0))
+
+class CleanupArticleHandler(webapp2.RequestHandler):
+    def post(self):
+        """Remove comments of and references to a retracted or deleted article."""
+        AcaApi()._cleanupArticle(self.request.get('websafeArticleKey'),
+            self.request.get('phase'), self.request.get('cursor') or None)
+
 # The task will check if there is more than one Article by this author,
 # also add a new Memcache entry that features the author and articles.
 class CheckFeaturedAuthorHandler(webapp2.RequestHandler):
     def post(self):
-        """set memcache entry if author has more than one article"""
-        articles = Article.query(parent=self.request.get('profileKey'))
-        not_found = not any(s.key.urlsafe() == self.request.get('sessionKey') for s in sessions)
-        if sessions.count() + not_found > 1:
-            memcache.set(MEMCACHE_FEATURED_ARTICLE_KEY, 
-                '%s is our latest Featured Author' % self.request.get(
-                'displayName'))
+        """set featured author if author has more than one article, or clear it"""
+        AcaApi()._checkFeaturedAuthor(self.request.get('websafeAuthorKey'))
 
 app = webapp2.WSGIApplication([
+    ('/_ah/warmup', WarmupHandler),
     ('/crons/set_announcement', SetAnnouncementHandler),
+    ('/crons/flush_views', FlushViewsHandler),
+    ('/crons/flush_comment_counts', FlushCommentCountsHandler),
+    ('/crons/send_comment_alerts', SendCommentAlertsHandler),
+    ('/crons/collect_stats', CollectStatsHandler),
     ('/tasks/send_confirmation_email', SendConfirmationEmailHandler),
     ('/tasks/check_featuredAuthor', CheckFeaturedAuthorHandler),
+    ('/tasks/refresh_cache', RefreshCacheHandler),
+    ('/tasks/rebuild_suggest', RebuildSuggestHandler),
+    ('/tasks/backfill_articles', BackfillArticlesHandler),
+    ('/tasks/backfill_html', BackfillHtmlHandler),
+    ('/tasks/backfill_comment_counts', BackfillCommentCountsHandler),
+    ('/tasks/backfill_legacy_ids', BackfillLegacyIDsHandler),
+    ('/article', LegacyArticleHandler),
+    ('/tasks/update_related', UpdateRelatedHandler),
+    ('/tasks/collect_stats', CollectStatsHandler),
+    ('/tasks/cleanup_article', CleanupArticleHandler),
 ], debug=True)
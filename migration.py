@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+
+"""
+migration.py -- copies the legacy Art Crime Archive Articles kind into
+    the new Article, Comment and Author kinds; only imported by the
+    admin endpoints that need it, to keep it out of instance start up
+
+"""
+
+__author__ = 'dan@salmonsen.org (Dan Salmonsen)'
+
+from google.appengine.ext import ndb
+from google.appengine.ext import db
+
+from models import Author, Article, Comment, LegacyArticle
+import render
+
+from pickle import loads
+
+FEATURED_LEGACY_IDS = [11006, 97006, 98006, 91006, 91004, 95001, 46003, 87006, 85006, 59001,
+    49001, 9001, 10001, 23008, 31006, 4001, 13001, 21012, 35008, 21005,
+    27001, 18002, 5001, 7001, 25001, 12002, 28011, 8002, 22002]
+
+class Articles(db.Model):
+  """Models an individual Archive entry"""
+  author = db.StringProperty()
+  embed = db.TextProperty()
+  title = db.StringProperty()
+  content = db.TextProperty()
+  tags = db.TextProperty()
+  comments = db.ListProperty(db.Text)
+  view = db.StringProperty() #Publish, Preview or Retract
+  date = db.DateTimeProperty(auto_now_add=True)
+
+
+def copyArticlesKind(article, author):
+    """Create new Article and Comment objects from old Articles object, returning True if success."""
+
+    # skip articles imported before
+    legacy_key = ndb.Key(LegacyArticle, str(article.key().id()))
+    if legacy_key.get():
+        return
+
+    article_id = Article.allocate_ids(size=1, parent=author.key)[0]
+    article_key = ndb.Key(Article, article_id, parent=author.key)
+
+    # copy ArticleForm/ProtoRPC Message into dict
+    data = db.to_dict(article)
+    data['key'] = article_key
+
+    if 'comments' in data:
+        for comment in data['comments']:
+            #Create new Comment object
+            comment_author_email = str(loads(str(comment))[1])
+            a_key = ndb.Key(Author, comment_author_email or 'unknown')
+            comment_author = a_key.get()
+            # create new Author if not there
+            if not comment_author:
+                comment_author = Author(
+                    key = a_key,
+                    authorID = str(Author.allocate_ids(size=1)[0]),
+                    displayName = comment_author_email.split('@')[0],
+                    mainEmail = comment_author_email,
+                )
+                comment_author.put()
+
+            comment_data = {
+                'comment': loads(str(comment))[0],
+                'authorName': comment_author.displayName if comment_author else 'unknown',
+                'authorID': comment_author.authorID if comment_author else 'unknown',
+                'dateCreated': loads(str(comment))[2]
+            }
+
+            comment_id = Comment.allocate_ids(size=1, parent=article_key)[0]
+            comment_key = ndb.Key(Comment, comment_id, parent=article_key)
+            comment_data['key'] = comment_key
+            comment_data['commentHtml'] = render.renderComment(comment_data['comment'])
+            comment_data['htmlVersion'] = render.HTML_VERSION
+
+            # create Comment
+            Comment(**comment_data).put()
+
+        data['commentCount'] = len(data['comments'])
+        del data['comments']
+
+    if 'tags' in data:
+        #del data['tags']
+        try:
+            data['tags'] = str(data['tags']).split(', ')
+        except UnicodeEncodeError:
+            del data['tags']
+    if 'tags' in data and data['tags'] == [""]:
+        del data['tags']
+
+    if 'id' in data:
+        del data['id']
+
+    if data['view'] == None:
+        del data['view']
+    else:
+        data['view'] = {'Publish': 'PUBLISHED', 'Preview': 'NOT_PUBLISHED', 'Retract': 'RETRACTED'}[str(data['view'])]
+
+    data['legacyID'] = str(article.key().id())
+
+    data['authorName'] = author.displayName
+    del data['author']
+    data['dateCreated'] = data['date']
+    del data['date']
+
+    data['contentHtml'] = render.renderContent(data.get('content'))
+    data['embedHtml'] = render.renderEmbed(data.get('embed'))
+    data['htmlVersion'] = render.HTML_VERSION
+
+    # create Article, and its entry for resolving legacy links
+    ndb.put_multi([Article(**data),
+        LegacyArticle(key=legacy_key, article=article_key, authorID=author.authorID)])
+
+
+def copyFromArticles():
+    """Copy all legacy Articles and their authors into the new kinds"""
+    for article in Articles().all():
+        if '@' not in article.author:
+            author_email = article.author + '@gmail.com'
+        else:
+            author_email = article.author
+
+        a_key = ndb.Key(Author, author_email)
+        author = a_key.get()
+        # create new Author if not there
+        if not author:
+            author = Author(
+                key = a_key,
+                authorID = str(Author.allocate_ids(size=1)[0]),
+                displayName = author_email.split('@')[0],
+                mainEmail = author_email,
+            )
+            author.put()
+
+        copyArticlesKind(article, author)
+
+
+def setFeaturedArticles(favorites_key):
+    """Add the legacy featured articles to the favorites of the Author of favorites_key"""
+    legacy_articles = ndb.get_multi([ndb.Key(LegacyArticle, str(legacyID))
+        for legacyID in FEATURED_LEGACY_IDS])
+    websafeArticleKeys = [legacy_article.article.urlsafe()
+        for legacy_article in legacy_articles if legacy_article]
+
+    @ndb.transactional()
+    def addFeatured():
+        favoritesAuthor = favorites_key.get()
+        for websafeArticleKey in websafeArticleKeys:
+            if websafeArticleKey not in favoritesAuthor.favoriteArticles:
+                favoritesAuthor.favoriteArticles.append(websafeArticleKey)
+
+        # one put for all the featured articles
+        favoritesAuthor.version += 1
+        favoritesAuthor.put()
+
+    addFeatured()
@@ -10,25 +10,25 @@ __author__ = 'dan@salmonsen.org (Dan Salmonsen)'
 
 import httplib
 import endpoints
+from endpoints import apiserving
 from protorpc import messages
 from google.appengine.ext import ndb
-from google.appengine.ext import db
-
-class Articles(db.Model):
-  """Models an individual Archive entry"""
-  author = db.StringProperty()
-  embed = db.TextProperty()
-  title = db.StringProperty()
-  content = db.TextProperty()
-  tags = db.TextProperty()
-  comments = db.ListProperty(db.Text)
-  view = db.StringProperty() #Publish, Preview or Retract
-  date = db.DateTimeProperty(auto_now_add=True)
+
+# Python 2.7's httplib has no 429, which ServiceException looks up for its error name
+httplib.responses.setdefault(429, 'Too Many Requests')
 
 class ConflictException(endpoints.ServiceException):
     """ConflictException -- exception mapped to HTTP 409 response"""
     http_status = httplib.CONFLICT
 
+class TooManyRequestsException(endpoints.ServiceException):
+    """TooManyRequestsException -- exception mapped to HTTP 429 response"""
+    http_status = 429
+
+# apiserving turns only the error names in its map into their HTTP status,
+# any other ServiceException is answered with 400
+apiserving._ERROR_NAME_MAP.setdefault(httplib.responses[429], TooManyRequestsException)
+
 class StringMessage(messages.Message):
     """StringMessage-- outbound (single) string message"""
     data = messages.StringField(1, required=True)
@@ -45,6 +45,16 @@ class Author(ndb.Model):
     organizations = ndb.StringProperty(repeated=True)
     favoriteArticles = ndb.StringProperty(repeated=True)
     userRights = ndb.StringProperty(default='AUTHOR')
+    version = ndb.IntegerProperty(default=0, indexed=False)
+
+class AuthorCounter(ndb.Model):
+    """AuthorCounter -- number of published Articles - parent is Author"""
+    published   = ndb.IntegerProperty(default=0, indexed=False)
+
+class FeaturedAuthor(ndb.Model):
+    """FeaturedAuthor -- the latest Author with more than one published Article"""
+    author      = ndb.KeyProperty(kind='Author')
+    announcement = ndb.StringProperty(indexed=False)
 
 class UserRights(messages.Enum):
     """UserRights enumeration values for Author"""
@@ -63,6 +73,7 @@ class AuthorForm(messages.Message):
     organizations = messages.StringField(5, repeated=True)    
     favoriteArticles = messages.StringField(6, repeated=True)
     userRights = messages.EnumField('UserRights', 7)
+    version = messages.IntegerField(8)
 
 class AuthorMiniForm(messages.Message):
     """Author outbound form message"""
@@ -79,14 +90,69 @@ class Article(ndb.Model):
     tags        = ndb.StringProperty(repeated=True)
     view        = ndb.StringProperty(default='NOT_PUBLISHED')
     dateCreated = ndb.DateTimeProperty(auto_now_add=True)
+    # set by content and view changes only, for the getArticleChanges feed
+    dateModified = ndb.DateTimeProperty(auto_now_add=True)
     # needed for original ACA article_id links
     legacyID    = ndb.StringProperty()
+    version     = ndb.IntegerProperty(default=0, indexed=False)
+    # safe HTML rendered from content and embed when written
+    contentHtml = ndb.TextProperty()
+    embedHtml   = ndb.TextProperty()
+    htmlVersion = ndb.IntegerProperty(default=0, indexed=False)
+    # buffered in memcache and added by the flush_comment_counts cron
+    commentCount = ndb.IntegerProperty(default=0, indexed=False)
+    # 'YYYY-MM' of dateCreated for published articles, for archive browsing
+    publishedMonth = ndb.ComputedProperty(lambda self: self.dateCreated.strftime('%Y-%m')
+        if self.view == 'PUBLISHED' and self.dateCreated else None)
+
+class LegacyArticle(ndb.Model):
+    """LegacyArticle -- Article imported from a legacy ACA article - id is the legacyID"""
+    article     = ndb.KeyProperty(kind='Article', indexed=False)
+    authorID    = ndb.StringProperty(indexed=False)
+
+class ArchiveCalendar(ndb.Model):
+    """ArchiveCalendar -- published Article counts per 'YYYY-MM' month"""
+    counts      = ndb.JsonProperty()
+
+class TagIndex(ndb.Model):
+    """TagIndex -- keys of the published Articles with a tag - id is the tag"""
+    articles    = ndb.KeyProperty(kind='Article', repeated=True, indexed=False)
+
+class RelatedArticles(ndb.Model):
+    """RelatedArticles -- best matching Articles by shared tags - parent is Article"""
+    articles    = ndb.KeyProperty(kind='Article', repeated=True, indexed=False)
+
+class ArchiveStats(ndb.Model):
+    """ArchiveStats -- counts collected by the archive stats job - id is 'current' or 'pending'"""
+    stats       = ndb.JsonProperty(compressed=True)
+    dateComputed = ndb.DateTimeProperty(auto_now=True)
+
+class ViewCounterShard(ndb.Model):
+    """ViewCounterShard -- one shard of an Article's view count"""
+    article     = ndb.KeyProperty(kind='Article')
+    count       = ndb.IntegerProperty(default=0, indexed=False)
+
+class ArticleTrend(ndb.Model):
+    """ArticleTrend -- decayed view score of an Article, for trending lists"""
+    article     = ndb.KeyProperty(kind='Article')
+    # log of views weighted by time; comparable between articles at any time
+    score       = ndb.FloatProperty(default=0.0)
 
 class View(messages.Enum):
     """View enumeration values for Article"""
     RETRACTED = 0
     NOT_PUBLISHED = 1
     PUBLISHED = 2
+    DELETED = 3 # content removed; kept so sync clients see the deletion
+
+class MonthCountForm(messages.Message):
+    """MonthCountForm -- published Article count for a 'YYYY-MM' month"""
+    month       = messages.StringField(1)
+    count       = messages.IntegerField(2)
+
+class MonthCountForms(messages.Message):
+    """MonthCountForms -- multiple MonthCountForm outbound form message"""
+    items = messages.MessageField(MonthCountForm, 1, repeated=True)
 
 class KeyForm(messages.Message):
     """KeyForm outbound form message"""
@@ -109,6 +175,31 @@ class ArticleForm(messages.Message):
     websafeAuthorKey   = messages.StringField(9)
     websafeArticleKey  = messages.StringField(10)
     view        = messages.EnumField('View', 11)
+    version     = messages.IntegerField(12)
+    contentHtml = messages.StringField(13)
+    embedHtml   = messages.StringField(14)
+    commentCount = messages.IntegerField(15)
+
+class ArticleChangeForm(messages.Message):
+    """ArticleChangeForm -- summary of a changed or removed Article"""
+    websafeArticleKey  = messages.StringField(1)
+    title       = messages.StringField(2)
+    authorName  = messages.StringField(3)
+    tags        = messages.StringField(4, repeated=True)
+    dateModified = messages.StringField(5)
+    view        = messages.EnumField('View', 6)
+    removed     = messages.BooleanField(7)
+
+class ArticlePageForms(messages.Message):
+    """ArticlePageForms -- a page of Articles and the token of the next page"""
+    items = messages.MessageField(ArticleForm, 1, repeated=True)
+    nextPageToken = messages.StringField(2)
+
+class ArticleChangeForms(messages.Message):
+    """ArticleChangeForms -- Article changes and the token to continue from"""
+    items = messages.MessageField(ArticleChangeForm, 1, repeated=True)
+    sinceToken  = messages.StringField(2)
+    more        = messages.BooleanField(3)
 
 class ArticleUpdateForm(messages.Message):
     """Article inbound form message"""
@@ -117,6 +208,7 @@ class ArticleUpdateForm(messages.Message):
     content     = messages.StringField(3)
     tags        = messages.StringField(4, repeated=True)
     view        = messages.EnumField('View', 5)
+    expectedVersion = messages.IntegerField(6)
 
 class GetArticleForm(messages.Message):
     """get Articles form message"""
@@ -126,6 +218,25 @@ class ArticleForms(messages.Message):
     """ArticleForms -- multiple Article outbound form message"""
     items = messages.MessageField(ArticleForm, 1, repeated=True)
 
+class ArticleRefForm(messages.Message):
+    """ArticleRefForm -- article by websafeArticleKey or authorID/articleID"""
+    websafeArticleKey  = messages.StringField(1)
+    authorID    = messages.StringField(2)
+    articleID   = messages.StringField(3)
+
+class ArticleRefForms(messages.Message):
+    """ArticleRefForms -- multiple ArticleRefForm inbound form message"""
+    items = messages.MessageField(ArticleRefForm, 1, repeated=True)
+
+class ArticleResultForm(messages.Message):
+    """ArticleResultForm -- batch item with an Article or an error"""
+    article     = messages.MessageField(ArticleForm, 1)
+    error       = messages.StringField(2)
+
+class ArticleResultForms(messages.Message):
+    """ArticleResultForms -- multiple ArticleResultForm outbound form message"""
+    items = messages.MessageField(ArticleResultForm, 1, repeated=True)
+
 class ArticleQueryForm(messages.Message):
     """ArticleQueryForm -- Article query inbound form message"""
     field = messages.StringField(1)
@@ -142,6 +253,14 @@ class Comment(ndb.Model):
     authorName  = ndb.StringProperty()
     authorID   = ndb.StringProperty()
     dateCreated = ndb.DateTimeProperty(auto_now_add=True)
+    version     = ndb.IntegerProperty(default=0, indexed=False)
+    # safe HTML rendered from comment when written
+    commentHtml = ndb.TextProperty()
+    htmlVersion = ndb.IntegerProperty(default=0, indexed=False)
+
+class ArticleSubscribers(ndb.Model):
+    """ArticleSubscribers -- emails of an Article's commenters - parent is Article"""
+    emails      = ndb.StringProperty(repeated=True, indexed=False)
 
 class CommentForm(messages.Message):
     """Article outbound form message"""
@@ -153,11 +272,118 @@ class CommentForm(messages.Message):
     websafeAuthorKey   = messages.StringField(6)
     websafeArticleKey   = messages.StringField(7)
     websafeCommentKey  = messages.StringField(8)
+    version = messages.IntegerField(9)
+    commentHtml = messages.StringField(10)
 
 class CommentUpdateForm(messages.Message):
     """Article outbound form message"""
     comment = messages.StringField(1)
+    expectedVersion = messages.IntegerField(2)
 
 class CommentForms(messages.Message):
     """multiple Comment outbound form message"""
     items = messages.MessageField(CommentForm, 1, repeated=True)
+
+class AuthorPageForm(messages.Message):
+    """AuthorPageForm -- Author with the first page of their articles, favorites and comments"""
+    author = messages.MessageField(AuthorForm, 1)
+    articles = messages.MessageField(ArticleForm, 2, repeated=True)
+    favorites = messages.MessageField(ArticleForm, 3, repeated=True)
+    comments = messages.MessageField(CommentForm, 4, repeated=True)
+
+class SuggestionForm(messages.Message):
+    """SuggestionForm -- a tag or author name completing a prefix"""
+    text        = messages.StringField(1)
+    kind        = messages.StringField(2)
+    count       = messages.IntegerField(3)
+
+class SuggestionForms(messages.Message):
+    """SuggestionForms -- multiple SuggestionForm outbound form message"""
+    items = messages.MessageField(SuggestionForm, 1, repeated=True)
+
+class CountForm(messages.Message):
+    """CountForm -- a named count"""
+    name        = messages.StringField(1)
+    count       = messages.IntegerField(2)
+
+class AuthorStatsForm(messages.Message):
+    """AuthorStatsForm -- article and comment counts of an Author"""
+    authorID    = messages.StringField(1)
+    displayName = messages.StringField(2)
+    articles    = messages.IntegerField(3)
+    comments    = messages.IntegerField(4)
+
+class ArchiveStatsForm(messages.Message):
+    """ArchiveStatsForm -- archive statistics outbound form message"""
+    articles    = messages.IntegerField(1)
+    comments    = messages.IntegerField(2)
+    authors     = messages.IntegerField(3)
+    byView      = messages.MessageField(CountForm, 4, repeated=True)
+    byMonth     = messages.MessageField(CountForm, 5, repeated=True)
+    byTag       = messages.MessageField(CountForm, 6, repeated=True)
+    byRights    = messages.MessageField(CountForm, 7, repeated=True)
+    byAuthor    = messages.MessageField(AuthorStatsForm, 8, repeated=True)
+    dateComputed = messages.StringField(9)
+
+class TraceEventForm(messages.Message):
+    """TraceEventForm -- an RPC or step within a traced request"""
+    name        = messages.StringField(1)
+    startMs     = messages.FloatField(2)
+    durationMs  = messages.FloatField(3)
+
+class TraceForm(messages.Message):
+    """TraceForm -- timeline of a traced request"""
+    endpoint    = messages.StringField(1)
+    date        = messages.StringField(2)
+    durationMs  = messages.FloatField(3)
+    events      = messages.MessageField(TraceEventForm, 4, repeated=True)
+
+class TraceForms(messages.Message):
+    """TraceForms -- multiple TraceForm outbound form message"""
+    items = messages.MessageField(TraceForm, 1, repeated=True)
+
+class BulkOperation(messages.Enum):
+    """BulkOperation enumeration values for administrative bulk changes"""
+    SET_RIGHTS = 0  # websafeKey of an Author
+    FEATURE = 1     # websafeKey of an Article, as for the rest
+    UNFEATURE = 2
+    ADD_TAG = 3
+    REMOVE_TAG = 4
+    SET_VIEW = 5
+
+class BulkOperationForm(messages.Message):
+    """BulkOperationForm -- one administrative change to an Author or Article"""
+    operation   = messages.EnumField('BulkOperation', 1)
+    websafeKey  = messages.StringField(2)
+    userRights  = messages.EnumField('UserRights', 3)
+    tag         = messages.StringField(4)
+    view        = messages.EnumField('View', 5)
+
+class BulkOperationForms(messages.Message):
+    """BulkOperationForms -- multiple BulkOperationForm inbound form message"""
+    items = messages.MessageField(BulkOperationForm, 1, repeated=True)
+
+class BulkResultForm(messages.Message):
+    """BulkResultForm -- result of a BulkOperationForm; no error if it was applied"""
+    websafeKey  = messages.StringField(1)
+    error       = messages.StringField(2)
+
+class BulkResultForms(messages.Message):
+    """BulkResultForms -- multiple BulkResultForm outbound form message"""
+    items = messages.MessageField(BulkResultForm, 1, repeated=True)
+
+class LegacyIDForms(messages.Message):
+    """LegacyIDForms -- legacy ACA article IDs inbound form message"""
+    legacyIDs = messages.StringField(1, repeated=True)
+
+class LegacyArticleForm(messages.Message):
+    """LegacyArticleForm -- Article of a legacy ACA article ID, or an error"""
+    legacyID    = messages.StringField(1)
+    websafeArticleKey  = messages.StringField(2)
+    authorID    = messages.StringField(3)
+    articleID   = messages.StringField(4)
+    error       = messages.StringField(5)
+
+class LegacyArticleForms(messages.Message):
+    """LegacyArticleForms -- multiple LegacyArticleForm outbound form message"""
+    items = messages.MessageField(LegacyArticleForm, 1, repeated=True)
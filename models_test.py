@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+"""
+models_test.py -- tests of the API exceptions in models.py;
+    run with the App Engine SDK on the path:
+
+    python -m unittest models_test
+"""
+
+__author__ = 'dan@salmonsen.org (Dan Salmonsen)'
+
+import unittest
+
+from endpoints import apiserving
+from protorpc import message_types
+from protorpc import protojson
+from protorpc import remote
+
+import endpoints
+
+from models import TooManyRequestsException
+
+
+@endpoints.api(name='ratelimited', version='v1')
+class RateLimitedApi(remote.Service):
+    @endpoints.method(message_types.VoidMessage, message_types.VoidMessage,
+            path='limited', http_method='GET', name='limited')
+    def limited(self, request):
+        raise TooManyRequestsException('Too many requests, try again later')
+
+
+class TooManyRequestsExceptionTest(unittest.TestCase):
+    def testErrorName(self):
+        error = TooManyRequestsException('Too many requests')
+        self.assertEqual(error.error_name, 'Too Many Requests')
+        self.assertEqual(error.message, 'Too many requests')
+
+    def testMappedTo429(self):
+        # the API server's conversion of the protorpc error of a raised exception
+        error = TooManyRequestsException('Too many requests')
+        body = protojson.encode_message(remote.RpcStatus(
+            state=remote.RpcStatus.State.APPLICATION_ERROR,
+            error_name=error.error_name,
+            error_message=error.message))
+        status, body = apiserving._ApiServer([RateLimitedApi])\
+            .protorpc_to_endpoints_error('400 Bad Request', body)
+        self.assertEqual(status, '429 Too Many Requests')
+        self.assertIn('Too many requests', body)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+
+"""
+render.py -- renders article content, embed code and comments to safe
+    HTML; run when they are written, so reads serve the stored result
+
+"""
+
+__author__ = 'dan@salmonsen.org (Dan Salmonsen)'
+
+import re
+
+try:
+    from HTMLParser import HTMLParser
+    from cgi import escape
+    from htmlentitydefs import name2codepoint
+except ImportError:
+    from html.parser import HTMLParser
+    from html import escape
+    from html.entities import name2codepoint
+
+# stored with the rendered HTML; bump when the rules below change so the
+# backfill renders existing entities again
+HTML_VERSION = 2
+
+# tag: allowed attributes
+CONTENT_TAGS = {
+    'a': ('href', 'title'),
+    'b': (), 'strong': (), 'i': (), 'em': (), 'u': (), 's': (),
+    'p': (), 'br': (), 'hr': (), 'div': (), 'span': (),
+    'h1': (), 'h2': (), 'h3': (), 'h4': (), 'h5': (), 'h6': (),
+    'ul': (), 'ol': (), 'li': (), 'blockquote': (), 'pre': (), 'code': (),
+    'img': ('src', 'alt', 'title', 'width', 'height'),
+}
+EMBED_TAGS = dict(CONTENT_TAGS, iframe=('src', 'width', 'height', 'frameborder', 'allowfullscreen'))
+EMBED_HOSTS = ('www.youtube.com', 'www.youtube-nocookie.com', 'player.vimeo.com')
+VOID_TAGS = ('br', 'hr', 'img')
+DROPPED_TAGS = ('script', 'style')      # dropped with their content
+URL_ATTRIBUTES = ('href', 'src')
+SAFE_URL = re.compile(r'^(https?:|mailto:|/|#|[^:]*$)', re.I)
+TEXT_URL = re.compile(r'(https?://[^\s<>"]+)')
+HTML_TAG = re.compile(r'<(/?[a-z][a-z0-9]*|!--)', re.I)
+
+
+class _Sanitizer(HTMLParser):
+    """Rebuilds HTML with only the allowed tags and attributes"""
+    def __init__(self, tags):
+        HTMLParser.__init__(self)
+        self.tags = tags
+        self.out = []
+        self.open = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropping += 1
+        if self.dropping or tag not in self.tags:
+            return
+        kept = []
+        for name, value in attrs:
+            if name not in self.tags[tag]:
+                continue
+            value = value or ''
+            if name in URL_ATTRIBUTES and not SAFE_URL.match(value.strip()):
+                continue
+            if tag == 'iframe' and name == 'src' and not _embedHost(value):
+                return
+            kept.append(' %s="%s"' % (name, escape(value, True)))
+        if tag == 'a':
+            kept.append(' rel="nofollow noopener"')
+        if tag == 'iframe' and not any(attr.startswith(' src=') for attr in kept):
+            return
+        self.out.append('<%s%s>' % (tag, ''.join(kept)))
+        if tag not in VOID_TAGS:
+            self.open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        # a self-closed <script/> has no content to drop
+        if tag in DROPPED_TAGS:
+            return
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open and self.open[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping or tag not in self.open:
+            return
+        # close tags left open inside this one
+        while self.open:
+            open_tag = self.open.pop()
+            self.out.append('</%s>' % open_tag)
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.out.append(escape(data))
+
+    def handle_entityref(self, name):
+        # also called for a bare '&' followed by letters, as in URLs
+        if not self.dropping:
+            self.out.append('&%s;' % name if name in name2codepoint else '&amp;' + name)
+
+    def handle_charref(self, name):
+        if not self.dropping:
+            self.out.append('&#%s;' % name)
+
+    def result(self):
+        self.close()
+        return ''.join(self.out + ['</%s>' % tag for tag in reversed(self.open)])
+
+
+def _embedHost(url):
+    match = re.match(r'^(?:https?:)?//([^/:]+)', url.strip(), re.I)
+    return match and match.group(1).lower() in EMBED_HOSTS
+
+
+def sanitizeHTML(source, tags=CONTENT_TAGS):
+    """Return source HTML with only the allowed tags, attributes and URLs"""
+    sanitizer = _Sanitizer(tags)
+    sanitizer.feed(source)
+    return sanitizer.result()
+
+
+def renderText(source):
+    """Return plain text as HTML paragraphs, with its URLs linked"""
+    paragraphs = re.split(r'\r?\n\s*\r?\n', source.strip())
+    html = []
+    for paragraph in paragraphs:
+        text = TEXT_URL.sub(r'<a href="\1" rel="nofollow noopener">\1</a>', escape(paragraph))
+        html.append('<p>%s</p>' % re.sub(r'\r?\n', '<br>', text))
+    return ''.join(html)
+
+
+def renderContent(source):
+    """Return safe HTML of article content, which is HTML or plain text"""
+    if not source:
+        return None
+    if not HTML_TAG.search(source):
+        return renderText(source)
+    return sanitizeHTML(source)
+
+
+def renderEmbed(source):
+    """Return safe HTML of embed code; iframes only from EMBED_HOSTS"""
+    if not source:
+        return None
+    return sanitizeHTML(source, EMBED_TAGS)
+
+
+def renderComment(source):
+    """Return safe HTML of a plain text comment"""
+    if not source:
+        return None
+    return renderText(source)
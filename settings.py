@@ -10,3 +10,7 @@ WEB_CLIENT_ID = '447343966882-fdduln9dci9pr8voubkgi23l8fn79ssj.apps.googleuserco
 ANDROID_CLIENT_ID = 'replace with Android client ID'
 IOS_CLIENT_ID = 'replace with iOS client ID'
 ANDROID_AUDIENCE = WEB_CLIENT_ID
+
+# Requests with this secret in their X-Aca-Trace header are always traced and
+# get their datastore commits back, for load tests; empty disables the header.
+TRACE_SECRET = ''
@@ -64,6 +64,27 @@ app.filter('startFrom', function () {
 });
 
 
+/**
+ * @ngdoc filter
+ * @name trustedHtml
+ *
+ * @description
+ * A filter that marks HTML as trusted; only for the HTML fields the API sanitizes when it stores them.
+ *
+ */
+app.filter('trustedHtml', ['$sce', function ($sce) {
+    /**
+     * Marks sanitized HTML as trusted.
+     *
+     * @param {String} html
+     * @returns {*}
+     */
+    var filter = function (html) {
+        return $sce.trustAsHtml(html || '');
+    }
+    return filter;
+}]);
+
 /**
  * @ngdoc constant
  * @name HTTP_ERRORS
@@ -38,7 +38,9 @@ acaApp.filters.filter('isFeatured', function() {
 });
 
 /* 
- * create a service to get Featured Articles
+ * create a service to call the aca endpoints; concurrent identical calls share
+ * one request, and responses of read endpoints are kept in localStorage,
+ * served at once and revalidated in the background once they are stale
  *
  */
 
@@ -53,8 +55,27 @@ acaApp.controllers.service('acaService', function acaService($q) {
         {'level': 'ADMINISTRATOR', 'text': "Administrator"}
     ];
 
-    var result={};
-    this.endpoint=function(endpoint, arg){
+    // read endpoint: seconds its cached response is used without revalidating
+    var cacheSeconds = {
+        'getFeaturedArticles': 60,
+        'getFeaturedArticleKeys': 60,
+        'getAllArticles': 60,
+        'getTrendingArticles': 300,
+        'getArchiveCalendar': 600,
+        'getArticle': 300,
+        'getArticleByKey': 300,
+        'getArticlesByAuthor': 60,
+        'getAuthorPage': 60,
+        'getMyProfile': 300,
+        'getMyArticles': 60,
+        'getMyFavoriteArticles': 60
+    };
+    var storagePrefix = 'aca:';
+
+    // cache key: promise of the call in flight
+    var inFlight = {};
+
+    var call = function (endpoint, arg) {
         //cloud endpoint api call with promise
         var deferred = $q.defer();
         var gapiCallback=function(){
@@ -77,6 +98,97 @@ acaApp.controllers.service('acaService', function acaService($q) {
         }
         return deferred.promise;
     };
+
+    var coalesced = function (key, endpoint, arg) {
+        // identical calls made while one is in flight share its promise
+        if (!inFlight[key]) {
+            inFlight[key] = call(endpoint, arg);
+            inFlight[key]['finally'](function () {
+                delete inFlight[key];
+            });
+        }
+        return inFlight[key];
+    };
+
+    var load = function (key) {
+        try {
+            return JSON.parse(window.localStorage.getItem(storagePrefix + key));
+        } catch (e) {
+            return null;
+        }
+    };
+
+    var store = function (key, result) {
+        try {
+            window.localStorage.setItem(storagePrefix + key,
+                JSON.stringify({time: Date.now(), result: result}));
+        } catch (e) {
+            // storage full or unavailable; the response just isn't kept
+        }
+    };
+
+    // the etag of endpoints responses changes with their content
+    var version = function (result) {
+        return (result && result.etag) || JSON.stringify(result);
+    };
+
+    /**
+     * Removes all cached responses, e.g. after a write or signing out.
+     */
+    this.clear = function () {
+        try {
+            for (var i = window.localStorage.length - 1; i >= 0; i--) {
+                var name = window.localStorage.key(i);
+                if (name.indexOf(storagePrefix) === 0) {
+                    window.localStorage.removeItem(name);
+                }
+            }
+        } catch (e) {
+        }
+    };
+
+    /**
+     * Calls an endpoint, returning a promise of its result.
+     * A cached result of a read endpoint resolves the promise at once; when it is stale it
+     * is revalidated, and onUpdate, if given, is called with the new result if it changed.
+     * Any other endpoint is a write, so its success clears the cached responses.
+     *
+     * @param {String} endpoint
+     * @param {Object} arg
+     * @param {Function} onUpdate
+     * @returns {Promise}
+     */
+    this.endpoint = function (endpoint, arg, onUpdate) {
+        var service = this;
+        var key = endpoint + ':' + JSON.stringify(arg || {});
+
+        if (!cacheSeconds[endpoint]) {
+            return coalesced(key, endpoint, arg).then(function (result) {
+                service.clear();
+                return result;
+            });
+        }
+
+        var cached = load(key);
+        var refresh = function () {
+            return coalesced(key, endpoint, arg).then(function (result) {
+                store(key, result);
+                return result;
+            });
+        };
+        if (!cached) {
+            return refresh();
+        }
+
+        if (Date.now() - cached.time > cacheSeconds[endpoint] * 1000) {
+            refresh().then(function (result) {
+                if (onUpdate && version(result) !== version(cached.result)) {
+                    onUpdate(result);
+                }
+            });
+        }
+        return $q.when(cached.result);
+    };
 });
 
 /**
@@ -87,7 +199,7 @@ acaApp.controllers.service('acaService', function acaService($q) {
  * A controller used for the My Profile page.
  */
 acaApp.controllers.controller('MyProfileCtrl',
-    function ($scope, $log, oauth2Provider, HTTP_ERRORS) {
+    function ($scope, $log, oauth2Provider, HTTP_ERRORS, acaService) {
         $scope.submitted = false;
         $scope.loading = false;
 
@@ -116,24 +228,21 @@ acaApp.controllers.controller('MyProfileCtrl',
             var retrieveProfileCallback = function () {
                 $scope.profile = {};
                 $scope.loading = true;
-                gapi.client.aca.getMyProfile().
-                    execute(function (resp) {
-                        $scope.$apply(function () {
-                            $scope.loading = false;
-                            if (resp.error) {
-                                // Failed to get a user profile.
-                            } else {
-                                // Succeeded to get the user profile.
-                                $scope.profile.displayName = resp.result.displayName;
-                                $scope.profile.mainEmail = resp.result.mainEmail;
-                                $scope.profile.organizations = resp.result.organizations;
-                                $scope.profile.userRights = resp.result.userRights;
-                                $scope.profile.authorID = resp.result.authorID;
-                                $scope.initialProfile = resp.result;
-                            }
-                        });
-                    }
-                );
+                var showProfile = function (result) {
+                    // Succeeded to get the user profile.
+                    $scope.loading = false;
+                    $scope.profile.displayName = result.displayName;
+                    $scope.profile.mainEmail = result.mainEmail;
+                    $scope.profile.organizations = result.organizations;
+                    $scope.profile.userRights = result.userRights;
+                    $scope.profile.authorID = result.authorID;
+                    $scope.initialProfile = result;
+                };
+                acaService.endpoint('getMyProfile', undefined, showProfile)
+                    .then(showProfile, function (error) {
+                        // Failed to get a user profile.
+                        $scope.loading = false;
+                    });
             };
             if (!oauth2Provider.signedIn) {
                 var modalInstance = oauth2Provider.showLoginModal();
@@ -167,6 +276,7 @@ acaApp.controllers.controller('MyProfileCtrl',
                             }
                         } else {
                             // The request has succeeded.
+                            acaService.clear();
                             $scope.messages = 'The profile has been updated';
                             $scope.alertStatus = 'success';
                             $scope.submitted = false;
@@ -192,7 +302,7 @@ acaApp.controllers.controller('MyProfileCtrl',
  * A controller used for the Create conferences page.
  */
 acaApp.controllers.controller('CreateArticleCtrl',
-    function ($scope, $log, oauth2Provider, HTTP_ERRORS) {
+    function ($scope, $log, oauth2Provider, HTTP_ERRORS, acaService) {
 
         /**
          * The conference object being edited in the page.
@@ -269,6 +379,7 @@ acaApp.controllers.controller('CreateArticleCtrl',
                             }
                         } else {
                             // The request has succeeded.
+                            acaService.clear();
                             $scope.messages = 'The article has been created : ' + resp.result.title;
                             $scope.alertStatus = 'success';
                             $scope.submitted = false;
@@ -293,25 +404,26 @@ acaApp.controllers.controller('FindArticlesCtrl', function ($scope, $log, oauth2
      * Load a list of featured article keys.
      */
 
-    var promiseFeaturedArticleKeys = acaService.endpoint('getFeaturedArticleKeys');
+    var showFeaturedArticleKeys = function(result) {
+        // The request has succeeded.
+        $scope.loading = false;
+        $log.info('getFeaturedArticleKeys success');
+        $scope.featuredKeys = [];
+        angular.forEach(result.items, function (key) {
+            $scope.featuredKeys.push(key.websafeKey);
+        });
+    };
+
+    var promiseFeaturedArticleKeys = acaService.endpoint('getFeaturedArticleKeys', undefined,
+        showFeaturedArticleKeys);
 
     $scope.loading = true;
 
     promiseFeaturedArticleKeys
-        .then(function(result) {
-            // The request has succeeded.
-            $scope.loading = false;
-            $log.info('getFeaturedArticleKeys success');
-            $scope.featuredKeys = [];
-            angular.forEach(result.items, function (key) {
-                $scope.featuredKeys.push(key.websafeKey);
-            });
-        }, function(error) {
+        .then(showFeaturedArticleKeys, function(error) {
             $scope.loading = false;
         });
 
-    var promiseMyProfile = acaService.endpoint('getMyProfile');
-
     $scope.loading = true;
     $scope.profile = {};
 
@@ -319,14 +431,18 @@ acaApp.controllers.controller('FindArticlesCtrl', function ($scope, $log, oauth2
      * Load the user profile if available for favorites.
      */
 
+    var showMyProfile = function(result) {
+        // The request has succeeded.
+        $scope.loading = false;
+        $log.info('getMyProfile success');
+        $scope.profile.userRights = result.userRights;
+        $scope.profile.favoriteArticles = result.favoriteArticles;
+    };
+
+    var promiseMyProfile = acaService.endpoint('getMyProfile', undefined, showMyProfile);
+
     promiseMyProfile
-        .then(function(result) {
-            // The request has succeeded.
-            $scope.loading = false;
-            $log.info('getMyProfile success');
-            $scope.profile.userRights = result.userRights;
-            $scope.profile.favoriteArticles = result.favoriteArticles;
-        }, function(error) {
+        .then(showMyProfile, function(error) {
             // Failed to get a user profile.
             $scope.loading = false;
         });
@@ -336,20 +452,37 @@ acaApp.controllers.controller('FindArticlesCtrl', function ($scope, $log, oauth2
      * Load the featured articles.
      */
 
-    var promiseFeaturedArticles = acaService.endpoint('getFeaturedArticles');
+    var showArticles = function(result) {
+        // The request has succeeded.
+        $scope.loading = false;
+        $scope.submitted = false;
+        $log.info('articles success');
+        $scope.articles = [];
+        angular.forEach(result.items, function (article) {
+            $scope.articles.push(article);
+        });
+    };
 
-    promiseFeaturedArticles
-        .then(function(result) {
-            // The request has succeeded.
-            $scope.loading = false;
-            $scope.submitted = false;
-            $log.info('getFeaturedArticles success');
-            $scope.articles = [];
-            angular.forEach(result.items, function (article) {
-                $scope.articles.push(article);
-            });
+    /**
+     * Returns showArticles for a new articles request, ignoring its results once
+     * another request was made; cached results and their updates of an earlier
+     * tab can arrive after the selected tab changed.
+     */
+    var latestArticles = 0;
+    var showLatestArticles = function () {
+        var request = ++latestArticles;
+        return function (result) {
+            if (request == latestArticles) {
+                showArticles(result);
+            }
+        };
+    };
+
+    var showFeaturedArticles = showLatestArticles();
+    var promiseFeaturedArticles = acaService.endpoint('getFeaturedArticles', undefined, showFeaturedArticles);
 
-        }, function(error) {
+    promiseFeaturedArticles
+        .then(showFeaturedArticles, function(error) {
             // The request has failed.
             var errorMessage = resp.error.message || '';
             $scope.messages = 'Failed to get articles : ' + errorMessage;
@@ -615,20 +748,11 @@ acaApp.controllers.controller('FindArticlesCtrl', function ($scope, $log, oauth2
      */
     $scope.callEndpoint = function (endpointName, arg) {
         $scope.loading = true;
-        var promise = acaService.endpoint(endpointName, arg);
+        var showEndpointArticles = showLatestArticles();
+        var promise = acaService.endpoint(endpointName, arg, showEndpointArticles);
 
         promise
-            .then(function(result) {
-                // The request has succeeded.
-                $scope.loading = false;
-                $scope.submitted = false;
-                $log.info('success');
-                $scope.articles = [];
-                angular.forEach(result.items, function (article) {
-                    $scope.articles.push(article);
-                });
-
-            }, function(error) {
+            .then(showEndpointArticles, function(error) {
                 // The request has failed.
                 var errorMessage = resp.error.message || '';
                 $scope.messages = 'Failed to get articles : ' + errorMessage;
@@ -656,6 +780,8 @@ acaApp.controllers.controller('FindArticlesCtrl', function ($scope, $log, oauth2
             }
         }
         $scope.loading = true;
+        // earlier articles requests no longer show their results
+        latestArticles++;
         gapi.client.aca.queryArticles(sendFilters).
             execute(function (resp) {
                 $scope.$apply(function () {
@@ -692,7 +818,7 @@ acaApp.controllers.controller('FindArticlesCtrl', function ($scope, $log, oauth2
  * @description
  * A controller used for the article detail page.
  */
-acaApp.controllers.controller('ArticleDetailCtrl', function ($scope, $log, $routeParams, HTTP_ERRORS) {
+acaApp.controllers.controller('ArticleDetailCtrl', function ($scope, $log, $routeParams, HTTP_ERRORS, acaService) {
     $scope.article = {};
 
     $scope.isUserFavorite = false;
@@ -704,46 +830,42 @@ acaApp.controllers.controller('ArticleDetailCtrl', function ($scope, $log, $rout
      */
     $scope.init = function () {
         $scope.loading = true;
-        gapi.client.aca.getArticle({
+        var showArticle = function (result) {
+            // The request has succeeded.
+            $scope.loading = false;
+            $scope.alertStatus = 'success';
+            $scope.article = result;
+        };
+        acaService.endpoint('getArticle', {
             authorID: $routeParams.authorID,
             articleID: $routeParams.articleID
-        }).execute(function (resp) {
-            $scope.$apply(function () {
-                $scope.loading = false;
-                if (resp.error) {
-                    // The request has failed.
-                    var errorMessage = resp.error.message || '';
-                    $scope.messages = 'Failed to get the article : ' + $routeParams.websafeKey
-                        + ' ' + errorMessage;
-                    $scope.alertStatus = 'warning';
-                    $log.error($scope.messages);
-                } else {
-                    // The request has succeeded.
-                    $scope.alertStatus = 'success';
-                    $scope.article = resp.result;
-                }
-            });
+        }, showArticle).then(showArticle, function (error) {
+            // The request has failed.
+            $scope.loading = false;
+            var errorMessage = (error && error.error && error.error.message) || '';
+            $scope.messages = 'Failed to get the article : ' + $routeParams.websafeKey
+                + ' ' + errorMessage;
+            $scope.alertStatus = 'warning';
+            $log.error($scope.messages);
         });
 
          $scope.loading = true;
         // If the user has favorited the article, updates the status message.
-        gapi.client.aca.getMyProfile().execute(function (resp) {
-            $scope.$apply(function () {
-                $scope.loading = false;
-                if (resp.error) {
-                    // Failed to get a user profile.
-                } else {
-                    var profile = resp.result;
-                    for (var i = 0; i < profile.favoriteArticles.length; i++) {
-                        if ($routeParams.websafeArticleKey == profile.favoriteArticles[i]) {
-                            // The user has favorited the article.
-                            $scope.alertStatus = 'info';
-                            $scope.messages = 'This article is in your Favorites';
-                            $scope.isUserFavorite = true;
-                        }
-                    }
+        var showFavorite = function (profile) {
+            $scope.loading = false;
+            var favorites = profile.favoriteArticles || [];
+            for (var i = 0; i < favorites.length; i++) {
+                if ($routeParams.websafeArticleKey == favorites[i]) {
+                    // The user has favorited the article.
+                    $scope.alertStatus = 'info';
+                    $scope.messages = 'This article is in your Favorites';
+                    $scope.isUserFavorite = true;
                 }
-            });
+            }
+        };
+        acaService.endpoint('getMyProfile', undefined, showFavorite).then(showFavorite, function (error) {
+            // Failed to get a user profile.
+            $scope.loading = false;
         });
     };
 
@@ -772,6 +894,7 @@ acaApp.controllers.controller('ArticleDetailCtrl', function ($scope, $log, $rout
                 } else {
                     if (resp.result) {
                         // Register succeeded.
+                        acaService.clear();
                         $scope.messages = 'Added article to favorites ';
                         $scope.alertStatus = 'success';
                         $scope.isUserFavorite = true;
@@ -835,7 +958,7 @@ acaApp.controllers.controller('ArticleDetailCtrl', function ($scope, $log, $rout
  * such as user authentications.
  *
  */
-acaApp.controllers.controller('RootCtrl', function ($scope, $location, oauth2Provider) {
+acaApp.controllers.controller('RootCtrl', function ($scope, $location, oauth2Provider, acaService) {
 
     /**
      * Returns if the viewLocation is the currently viewed page.
@@ -899,6 +1022,8 @@ acaApp.controllers.controller('RootCtrl', function ($scope, $location, oauth2Pro
      */
     $scope.signOut = function () {
         oauth2Provider.signOut();
+        // cached responses include the user's profile and articles
+        acaService.clear();
         $scope.alertStatus = 'success';
         $scope.rootMessages = 'Logged out';
     };
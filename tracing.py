@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+
+"""
+tracing.py -- sampled request tracing for the aca API;
+    keeps the slowest traces per endpoint in instance memory
+
+"""
+
+__author__ = 'dan@salmonsen.org (Dan Salmonsen)'
+
+import heapq
+import hmac
+import random
+import threading
+import time
+from datetime import datetime
+
+from google.appengine.api import apiproxy_stub_map
+
+from settings import TRACE_SECRET
+
+TRACE_SAMPLE_RATE = 0.01        # fraction of requests traced
+TRACE_HEADER = 'HTTP_X_ACA_TRACE'   # requests with TRACE_SECRET in this header are always traced
+COMMITS_HEADER = 'X-Aca-Commits'    # 'commits/failed' in responses to those, for load tests
+TRACES_PER_ENDPOINT = 10
+TRACED_SERVICES = ('datastore_v3', 'memcache', 'taskqueue')
+
+# trace of the request running on this thread, if it is traced
+_current = threading.local()
+
+# endpoint name: min-heap of (duration, trace) for the slowest traces
+_slowest = {}
+_slowest_lock = threading.Lock()
+
+
+class Span(object):
+    """Context manager recording a named step in the current trace"""
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.time()
+
+    def __exit__(self, *exc_info):
+        trace = getattr(_current, 'trace', None)
+        if trace is not None:
+            trace['events'].append((self.name, self.start, time.time() - self.start))
+
+
+class TraceMiddleware(object):
+    """WSGI middleware tracing a sample of the API requests"""
+    def __init__(self, app):
+        self.app = app
+
+    def __call__(self, environ, start_response):
+        forced = bool(TRACE_SECRET) and hmac.compare_digest(
+            environ.get(TRACE_HEADER, ''), TRACE_SECRET)
+        if not forced and random.random() >= TRACE_SAMPLE_RATE:
+            return self.app(environ, start_response)
+
+        endpoint = environ.get('PATH_INFO', '').rsplit('.', 1)[-1]
+        trace = {'endpoint': endpoint, 'date': datetime.now(), 'start': time.time(),
+            'events': [], 'rpcs': {}}
+        _current.trace = trace
+
+        def commits_start_response(status, headers, *exc_info):
+            # failed commits are datastore contention; ndb retries the transaction
+            commits = [name for name, start, duration in trace['events']
+                if name.startswith('datastore_v3.Commit')]
+            failed = len([name for name in commits if name != 'datastore_v3.Commit'])
+            headers = headers + [(COMMITS_HEADER, '%d/%d' % (len(commits), failed))]
+            return start_response(status, headers, *exc_info)
+
+        if forced:
+            traced_start_response = commits_start_response
+        else:
+            traced_start_response = start_response
+        try:
+            return self.app(environ, traced_start_response)
+        finally:
+            _current.trace = None
+            trace['duration'] = time.time() - trace['start']
+            del trace['rpcs']
+            _record(trace)
+
+
+def _record(trace):
+    """Keep trace if it is among the slowest for its endpoint"""
+    with _slowest_lock:
+        traces = _slowest.setdefault(trace['endpoint'], [])
+        if len(traces) < TRACES_PER_ENDPOINT:
+            heapq.heappush(traces, (trace['duration'], trace))
+        elif trace['duration'] > traces[0][0]:
+            heapq.heapreplace(traces, (trace['duration'], trace))
+
+
+def slowTraces():
+    """Return the slowest traces of every endpoint, slowest first"""
+    with _slowest_lock:
+        traces = [trace for heap in _slowest.values() for duration, trace in heap]
+    return sorted(traces, key=lambda trace: -trace['duration'])
+
+
+def _preCall(service, call, request, response, rpc):
+    trace = getattr(_current, 'trace', None)
+    if trace is not None:
+        trace['rpcs'][id(rpc)] = time.time()
+
+
+def _postCall(service, call, request, response, rpc, error):
+    trace = getattr(_current, 'trace', None)
+    if trace is not None:
+        start = trace['rpcs'].pop(id(rpc), None)
+        if start is not None:
+            name = '%s.%s' % (service, call)
+            if error is not None:
+                name += ' (%s)' % error.__class__.__name__
+            trace['events'].append((name, start, time.time() - start))
+
+
+for service in TRACED_SERVICES:
+    apiproxy_stub_map.apiproxy.GetPreCallHooks().Append('aca_trace_' + service, _preCall, service)
+    apiproxy_stub_map.apiproxy.GetPostCallHooks().Append('aca_trace_' + service, _postCall, service)